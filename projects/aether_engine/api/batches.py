@@ -0,0 +1,294 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, false, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .jobs import TransitionListener
+from .models import (DEPLOYING, FAILED, QUEUED, RUNNING, SKIPPED, SUCCEEDED, WAITING,
+                     BatchService, Deployment, DeploymentBatch)
+
+logger = logging.getLogger(__name__)
+
+TERMINAL = (SUCCEEDED, FAILED, SKIPPED)
+
+def plan_batch(services: List[BatchService]) -> List[BatchService]:
+    # Topological order (Kahn); raises ValueError for duplicate names, unknown dependencies or a cycle
+    by_name: Dict[str, BatchService] = {}
+    for item in services:
+        if item.service in by_name:
+            raise ValueError(f"Duplicate service: {item.service}")
+        by_name[item.service] = item
+    for item in services:
+        unknown = sorted(set(item.depends_on) - set(by_name))
+        if unknown:
+            raise ValueError(f"{item.service} depends on unknown service: {', '.join(unknown)}")
+        if item.service in item.depends_on:
+            raise ValueError(f"Dependency cycle: {item.service} -> {item.service}")
+
+    pending = {item.service: len(set(item.depends_on)) for item in services}
+    dependents: Dict[str, List[str]] = {name: [] for name in by_name}
+    for item in services:
+        for upstream in set(item.depends_on):
+            dependents[upstream].append(item.service)
+    ready = [item.service for item in services if not pending[item.service]]
+    order = []
+    while ready:
+        name = ready.pop(0)
+        order.append(by_name[name])
+        for downstream in dependents[name]:
+            pending[downstream] -= 1
+            if not pending[downstream]:
+                ready.append(downstream)
+    if len(order) < len(services):
+        raise ValueError(f"Dependency cycle: {' -> '.join(_find_cycle(by_name, pending))}")
+    return order
+
+def _find_cycle(by_name: Dict[str, BatchService], pending: Dict[str, int]) -> List[str]:
+    # Every service left with unmet dependencies has one that is also left, so walking them must loop
+    path: List[str] = []
+    name = next(name for name, count in pending.items() if count)
+    while name not in path:
+        path.append(name)
+        name = next(upstream for upstream in by_name[name].depends_on if pending[upstream])
+    return path[path.index(name):] + [name]
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round(max((end - start).total_seconds(), 0.0), 3)
+
+def batch_report(batch: DeploymentBatch, jobs: List[Deployment], now: Optional[datetime] = None) -> dict:
+    """Progress and timing of a batch: the critical path is the dependency chain that ended last.
+
+    Walking back from the last job to finish, each step follows the upstream that
+    finished latest (the one it was actually waiting for). Per step, slot_wait is
+    the time between its dependencies finishing and a max_parallel slot, queue_wait
+    the time Queued until a worker took it, and run the deploy itself.
+    """
+    now = now or datetime.utcnow()
+    by_id = {job.id: job for job in jobs}
+    counts: Dict[str, int] = {}
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+
+    path = []
+    job = max((job for job in jobs if job.finished_at is not None), key=lambda job: job.finished_at, default=None)
+    while job is not None:
+        upstream = [by_id[i] for i in json.loads(job.depends_on or "[]") if i in by_id]
+        previous = max((u for u in upstream if u.finished_at is not None), key=lambda u: u.finished_at, default=None)
+        ready_at = previous.finished_at if previous is not None else batch.created_at
+        path.append({
+            "deployment_id": job.id,
+            "service_name": job.service_name,
+            "status": job.status,
+            "slot_wait_seconds": _seconds(ready_at, job.queued_at),
+            "queue_wait_seconds": _seconds(job.queued_at, job.started_at),
+            "run_seconds": _seconds(job.started_at, job.finished_at),
+        })
+        job = previous
+    path.reverse()
+
+    elapsed = _seconds(batch.created_at, batch.finished_at or now)
+    run_total = sum(step["run_seconds"] or 0.0 for step in path)
+    deploy_total = sum(_seconds(job.started_at, job.finished_at) or 0.0 for job in jobs)
+    return {
+        "batch_id": batch.id,
+        "status": batch.status,
+        "max_parallel": batch.max_parallel,
+        "created_at": batch.created_at,
+        "finished_at": batch.finished_at,
+        "counts": counts,
+        "timing": {
+            "elapsed_seconds": elapsed,
+            "critical_path_run_seconds": round(run_total, 3),
+            "critical_path_wait_seconds": round(max(elapsed - run_total, 0.0), 3),
+            # Sum of every deploy: roughly what running the batch one service at a time would take
+            "total_deploy_seconds": round(deploy_total, 3),
+            "parallelism": round(deploy_total / elapsed, 2) if elapsed else None,
+        },
+        "critical_path": path,
+    }
+
+class BatchScheduler:
+    """Releases batch jobs to the job engine as their dependencies succeed.
+
+    Jobs are created Waiting. Whenever a job of the batch finishes, the batch is
+    advanced in one transaction: Waiting jobs with a Failed or Skipped upstream
+    become Skipped (only the failure's downstream stops), and Waiting jobs whose
+    upstreams all Succeeded are Queued, longest remaining chain first, while the
+    batch has fewer than ``max_parallel`` jobs Queued or Deploying. The job engine
+    then runs them like any other deployment. Running batches are advanced again
+    on start, so nothing is lost across restarts.
+    """
+
+    def __init__(self, engine: AsyncEngine, listener: Optional[TransitionListener] = None,
+                 notify: Optional[Callable[[], None]] = None, retry_interval: float = 1.0):
+        self.engine = engine
+        self.listener = listener
+        self.notify = notify
+        self.retry_interval = retry_interval
+        self._lock = asyncio.Lock()
+        self._pending: Set[int] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self.created = 0
+        self.released = 0
+        self.skipped = 0
+        self.advances = 0
+
+    async def create(self, services: List[BatchService], max_parallel: int) -> Tuple[DeploymentBatch, List[Deployment]]:
+        # Validate before writing anything; ids follow the topological order
+        order = plan_batch(services)
+        now = datetime.utcnow()
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            batch = DeploymentBatch(max_parallel=max_parallel, created_at=now)
+            session.add(batch)
+            await session.flush()
+            jobs = {item.service: Deployment(service_name=item.service, status=WAITING,
+                                             vault_record_id=item.vault_id, batch_id=batch.id)
+                    for item in order}
+            session.add_all(jobs.values())
+            await session.flush()
+            for item in order:
+                jobs[item.service].depends_on = json.dumps(sorted({jobs[name].id for name in item.depends_on}))
+            await session.commit()
+        self.created += 1
+        if self.listener is not None:
+            self.listener(list(jobs.values()))
+        await self.advance(batch.id)
+        return batch, list(jobs.values())
+
+    async def resume(self):
+        async with AsyncSession(self.engine) as session:
+            batch_ids = (await session.exec(select(DeploymentBatch.id).where(DeploymentBatch.status == RUNNING))).all()
+        for batch_id in batch_ids:
+            await self.advance(batch_id)
+
+    def on_transitions(self, deployments: List[Deployment]):
+        # Job engine listener: a finished batch job may unblock (or skip) its downstream
+        batch_ids = {job.batch_id for job in deployments if job.batch_id is not None and job.status in TERMINAL}
+        if not batch_ids:
+            return
+        self._pending |= batch_ids
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        while self._pending:
+            batch_id = self._pending.pop()
+            try:
+                await self.advance(batch_id)
+            except Exception as exc:
+                # Usually a briefly locked database; try again rather than leave the batch stalled
+                logger.error("Advancing batch %s failed: %s", batch_id, exc)
+                self._pending.add(batch_id)
+                await asyncio.sleep(self.retry_interval)
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def advance(self, batch_id: int):
+        async with self._lock:
+            changed = await self._advance(batch_id)
+        self.advances += 1
+        if changed and self.listener is not None:
+            self.listener(changed)
+        if any(job.status == QUEUED for job in changed) and self.notify is not None:
+            self.notify()
+
+    async def _advance(self, batch_id: int) -> List[Deployment]:
+        now = datetime.utcnow()
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            conn = await session.connection()
+            # Take the write lock before reading: the job engine commits finished jobs concurrently, and
+            # SQLite refuses to upgrade a read transaction whose snapshot another writer has moved past
+            await conn.execute(update(DeploymentBatch).where(false()).values(status=RUNNING))
+            batch = await session.get(DeploymentBatch, batch_id)
+            if batch is None or batch.status != RUNNING:
+                return []
+            jobs = (await session.exec(
+                select(Deployment).where(Deployment.batch_id == batch_id).order_by(Deployment.id))).all()
+            # Detached snapshots: every write below is an explicit guarded UPDATE
+            session.expunge_all()
+            by_id = {job.id: job for job in jobs}
+            upstream = {job.id: json.loads(job.depends_on or "[]") for job in jobs}
+
+            # Ids are in topological order, so one pass settles skips transitively
+            skipped, ready = [], []
+            for job in jobs:
+                if job.status != WAITING:
+                    continue
+                blocked = [by_id[i] for i in upstream[job.id] if by_id[i].status in (FAILED, SKIPPED)]
+                if blocked:
+                    job.status, job.finished_at = SKIPPED, now
+                    job.error = "Upstream not deployed: " + ", ".join(u.service_name for u in blocked)
+                    skipped.append(job)
+                elif all(by_id[i].status == SUCCEEDED for i in upstream[job.id]):
+                    ready.append(job)
+
+            active = sum(job.status in (QUEUED, DEPLOYING) for job in jobs)
+            if ready and batch.max_parallel > active:
+                chain = self._chain_length(jobs, upstream)
+                ready.sort(key=lambda job: -chain[job.id])
+            released = ready[:max(batch.max_parallel - active, 0)]
+            for job in released:
+                job.status, job.queued_at = QUEUED, now
+
+            changed = skipped + released
+            if changed:
+                # Guarded like the job engine's updates: only a Waiting job may be released or skipped
+                await conn.execute(
+                    update(Deployment)
+                    .where(Deployment.id == bindparam("job_id"), Deployment.status == WAITING)
+                    .values(status=bindparam("new_status"), queued_at=bindparam("queued"),
+                            finished_at=bindparam("finished"), error=bindparam("message")),
+                    [{"job_id": job.id, "new_status": job.status, "queued": job.queued_at,
+                      "finished": job.finished_at, "message": job.error} for job in changed],
+                )
+            if all(job.status in TERMINAL for job in jobs):
+                batch.status = SUCCEEDED if all(job.status == SUCCEEDED for job in jobs) else FAILED
+                batch.finished_at = max((job.finished_at for job in jobs if job.finished_at), default=now)
+                await conn.execute(
+                    update(DeploymentBatch)
+                    .where(DeploymentBatch.id == batch_id, DeploymentBatch.status == RUNNING)
+                    .values(status=batch.status, finished_at=batch.finished_at)
+                )
+            await session.commit()
+        self.released += len(released)
+        self.skipped += len(skipped)
+        return changed
+
+    @staticmethod
+    def _chain_length(jobs: List[Deployment], upstream: Dict[int, List[int]]) -> Dict[int, int]:
+        # Jobs on each one's longest downstream chain, itself included; computed in reverse topological order
+        length = {job.id: 1 for job in jobs}
+        for job in reversed(jobs):
+            for i in upstream[job.id]:
+                length[i] = max(length[i], length[job.id] + 1)
+        return length
+
+    async def report(self, batch_id: int) -> Optional[dict]:
+        async with AsyncSession(self.engine) as session:
+            batch = await session.get(DeploymentBatch, batch_id)
+            if batch is None:
+                return None
+            jobs = (await session.exec(
+                select(Deployment).where(Deployment.batch_id == batch_id).order_by(Deployment.id))).all()
+        report = batch_report(batch, jobs)
+        report["deployments"] = jobs
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "created": self.created,
+            "released": self.released,
+            "skipped": self.skipped,
+            "advances": self.advances,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from ...cognis_vault.sdk.cognis_async_sdk import AsyncCognisSDK
+from ...cognis_vault.sdk.records import DECRYPTION_FAILED
+
+class Credential:
+    """A decrypted vault secret. The plaintext lives in a bytearray so eviction can overwrite it.
+
+    Best effort only: the str/bytes copies made while decrypting are immutable and
+    are left to the garbage collector; the cached copy is the long-lived one.
+    """
+
+    __slots__ = ("record_id", "title", "service_type", "secret", "loaded_at", "evicted", "_leases")
+
+    def __init__(self, record_id: int, title: str, service_type: str, secret: bytearray):
+        self.record_id = record_id
+        self.title = title
+        self.service_type = service_type
+        self.secret = secret
+        self.loaded_at = time.monotonic()
+        self.evicted = False
+        self._leases = 0
+
+    def wipe(self):
+        self.secret[:] = bytes(len(self.secret))
+        self.secret.clear()
+
+def _token_expiry(token: str) -> float:
+    # exp claim (epoch seconds) read without verification; the vault verifies the signature
+    payload = token.split(".")[1]
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    return float(claims["exp"])
+
+class CredentialCache:
+    """Deploy credentials from Cognis Vault, keyed by vault record id.
+
+    One vault session is shared: the first use logs in (PBKDF2 runs once), and the
+    token is renewed ``refresh_margin`` seconds before its exp claim without
+    deriving the key again. Entries expire after ``ttl`` seconds, and the least
+    recently used is evicted beyond ``max_entries``. Concurrent misses for the
+    same record share a single fetch. Evicted or expired secrets are zeroed once
+    no lease on them is still open.
+    """
+
+    def __init__(self, sdk: AsyncCognisSDK, username: str, password: str, ttl: float = 300.0,
+                 max_entries: int = 256, refresh_margin: float = 300.0):
+        self.sdk = sdk
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.refresh_margin = refresh_margin
+        self._username = username
+        self._password = password
+        self._entries: "OrderedDict[int, Credential]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._session_lock = asyncio.Lock()
+        self._token_expires_at = 0.0
+        self._next_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+        self.evictions = 0
+        self.logins = 0
+        self.token_renewals = 0
+
+    @asynccontextmanager
+    async def lease(self, record_id: int) -> AsyncIterator[Credential]:
+        """Use a credential for the duration of the block; eviction never wipes it mid-use"""
+        credential = await self.get(record_id)
+        credential._leases += 1
+        try:
+            yield credential
+        finally:
+            credential._leases -= 1
+            if credential.evicted and not credential._leases:
+                credential.wipe()
+
+    async def get(self, record_id: int) -> Credential:
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._purge_expired(now)
+        credential = self._entries.get(record_id)
+        if credential is not None and now - credential.loaded_at < self.ttl:
+            self._entries.move_to_end(record_id)
+            self.hits += 1
+            return credential
+        task = self._loading.get(record_id)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._load(record_id))
+            self._loading[record_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(record_id, None))
+        else:
+            self.shared_loads += 1
+        # shield: a cancelled deploy does not abort the fetch other deploys are waiting on
+        return await asyncio.shield(task)
+
+    async def _load(self, record_id: int) -> Credential:
+        await self._ensure_session()
+        # Nothing is cached unless the secret really decrypted; each failure keeps its own cause
+        try:
+            record = await self.sdk.fetch_secret(record_id)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 401:
+                # Token rejected before its exp claim (e.g. server key rotated): log in again next time
+                self._token_expires_at = 0.0
+                raise PermissionError(f"Cognis Vault rejected the session fetching record {record_id}") from exc
+            raise RuntimeError(f"Cognis Vault returned {exc.response.status_code} for record {record_id}") from exc
+        except httpx.HTTPError as exc:
+            raise ConnectionError(f"Cognis Vault unreachable fetching record {record_id}: {exc}") from exc
+        if record is None:
+            raise LookupError(f"Vault record {record_id} not found")
+        if record["payload"] == DECRYPTION_FAILED:
+            raise ValueError(f"Vault record {record_id} could not be decrypted with the deploy account's key")
+        credential = Credential(record_id, record.get("title", ""), record.get("service_type", ""),
+                                bytearray(record["payload"].encode()))
+        del record
+        previous = self._entries.pop(record_id, None)
+        if previous is not None:
+            self._evict(previous)
+        self._entries[record_id] = credential
+        while len(self._entries) > self.max_entries:
+            self._evict(self._entries.popitem(last=False)[1])
+        return credential
+
+    async def _ensure_session(self):
+        if self.sdk.token and time.time() < self._token_expires_at - self.refresh_margin:
+            return
+        async with self._session_lock:
+            # Re-check: another load may have refreshed the session while this one waited
+            if self.sdk.token and time.time() < self._token_expires_at - self.refresh_margin:
+                return
+            if self.sdk.fernet is None:
+                ok = await self.sdk.login(self._username, self._password)
+                self.logins += 1
+            else:
+                ok = await self.sdk.renew_token(self._username, self._password)
+                self.token_renewals += 1
+            if not ok:
+                raise RuntimeError("Cognis Vault login failed")
+            self._token_expires_at = _token_expiry(self.sdk.token)
+
+    def _evict(self, credential: Credential):
+        credential.evicted = True
+        self.evictions += 1
+        if not credential._leases:
+            credential.wipe()
+
+    def _purge_expired(self, now: float):
+        for record_id, credential in list(self._entries.items()):
+            if now - credential.loaded_at >= self.ttl:
+                self._evict(self._entries.pop(record_id))
+        self._next_purge = now + self.ttl / 4
+
+    def clear(self):
+        for credential in self._entries.values():
+            self._evict(credential)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_loads": self.shared_loads,
+            "evictions": self.evictions,
+            "logins": self.logins,
+            "token_renewals": self.token_renewals,
+        }
+
+def cache_from_env() -> Optional[CredentialCache]:
+    # Disabled unless a vault account is configured; deploys then run without credentials
+    password = os.getenv("AETHER_VAULT_PASSWORD")
+    if not password:
+        return None
+    return CredentialCache(
+        AsyncCognisSDK(os.getenv("AETHER_VAULT_URL", "http://127.0.0.1:8888")),
+        os.getenv("AETHER_VAULT_USERNAME", "automated_user"),
+        password,
+        ttl=float(os.getenv("AETHER_CREDENTIAL_TTL_SECONDS", "300")),
+        max_entries=int(os.getenv("AETHER_CREDENTIAL_CACHE_SIZE", "256")),
+        refresh_margin=float(os.getenv("AETHER_TOKEN_REFRESH_MARGIN_SECONDS", "300")),
+    )
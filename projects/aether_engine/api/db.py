@@ -0,0 +1,52 @@
+import os
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DATABASE_URL = os.getenv("AETHER_DATABASE_URL", "sqlite+aiosqlite:///./aether_engine.db")
+if DATABASE_URL.startswith("sqlite:///"):
+    DATABASE_URL = "sqlite+aiosqlite:///" + DATABASE_URL[len("sqlite:///"):]
+
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=int(os.getenv("AETHER_DB_POOL_SIZE", "8")),
+    max_overflow=int(os.getenv("AETHER_DB_MAX_OVERFLOW", "8")),
+)
+
+@event.listens_for(engine.sync_engine, "connect")
+def configure_sqlite(dbapi_connection, connection_record):
+    # WAL: status reads never wait on the deployment writer; writers queue on busy_timeout
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('AETHER_DB_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def ensure_columns(connection):
+    # create_all skips existing tables; columns added later need a server default (or NULL) to be appended
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                spec = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {spec}")
+
+def ensure_indexes(connection):
+    # Same for indexes declared after the table was first created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(ensure_columns)
+        await conn.run_sync(ensure_indexes)
+
+async def get_session():
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
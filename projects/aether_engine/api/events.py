@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+# (id, event name, JSON data)
+Event = Tuple[str, str, str]
+
+class Subscription:
+    """One stream consumer: a replay backlog, then live events from a bounded queue"""
+
+    def __init__(self, hub: "EventHub", backlog: List[Event], queue_size: int):
+        self.hub = hub
+        self.backlog = backlog
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    async def events(self, keepalive: float) -> AsyncIterator[Optional[Event]]:
+        # Yields None after keepalive seconds without events. A dropped subscriber still drains
+        # what was queued before the drop, then ends; the client resumes from its last id.
+        try:
+            for event in self.backlog:
+                yield event
+            self.backlog = []
+            while not (self.dropped and self.queue.empty()):
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                # None is the wake-up put by EventHub.close(), not an event
+                if event is not None:
+                    yield event
+        finally:
+            self.hub.unsubscribe(self)
+
+class EventHub:
+    """In-process pub/sub for deployment state changes.
+
+    Each subscriber has a bounded queue; publish never waits, and a subscriber
+    whose queue is full is dropped instead of slowing everyone else. Recent
+    events are kept so a reconnecting client can resume from its Last-Event-ID.
+    Ids carry a per-process prefix: after a restart (or once the requested id
+    has left the history) the client gets a "reset" event and should refetch.
+    close() ends every stream (server shutdown); later subscriptions end at once.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._prefix = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self.closed = False
+        self.published = 0
+        self.dropped = 0
+        self.resets = 0
+
+    def publish(self, name: str, data: dict):
+        self._seq += 1
+        event = (f"{self._prefix}-{self._seq}", name, json.dumps(data, separators=(",", ":")))
+        self._history.append((self._seq, event))
+        self.published += 1
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self._subscribers.discard(subscription)
+                self.dropped += 1
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        # Synchronous, so no event can slip between the replay and the live queue
+        backlog: List[Event] = []
+        if last_event_id:
+            seq = self._resume_point(last_event_id)
+            if seq is None:
+                self.resets += 1
+                backlog.append((f"{self._prefix}-{self._seq}", "reset", "{}"))
+            else:
+                backlog.extend(event for event_seq, event in self._history if event_seq > seq)
+        subscription = Subscription(self, backlog, self.queue_size)
+        if self.closed:
+            subscription.dropped = True
+        else:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _resume_point(self, last_event_id: str) -> Optional[int]:
+        prefix, _, seq = last_event_id.partition("-")
+        if prefix != self._prefix or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        oldest = self._history[0][0] if self._history else self._seq + 1
+        # Every event after seq must still be in the history
+        return int(seq) if int(seq) >= oldest - 1 else None
+
+    def close(self):
+        # Streams drain what is already queued and return, so open responses no longer hold up shutdown
+        self.closed = True
+        for subscription in list(self._subscribers):
+            subscription.dropped = True
+            try:
+                subscription.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass  # a full queue is never waited on
+        self._subscribers.clear()
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+            "resets": self.resets,
+            "history": len(self._history),
+        }
+
+def format_sse(event: Optional[Event]) -> str:
+    if event is None:
+        return ": keepalive\n\n"
+    event_id, name, data = event
+    return f"id: {event_id}\nevent: {name}\ndata: {data}\n\n"
+
+def hub_from_env() -> EventHub:
+    return EventHub(
+        history=int(os.getenv("AETHER_EVENT_HISTORY", "1000")),
+        queue_size=int(os.getenv("AETHER_EVENT_QUEUE_SIZE", "256")),
+    )
@@ -0,0 +1,230 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .credentials import Credential, CredentialCache
+from .models import DEPLOYING, FAILED, QUEUED, SUCCEEDED, Deployment
+
+logger = logging.getLogger(__name__)
+
+# A deploy step receives the claimed job (id, service_name, vault_record_id, ...); raising marks it Failed
+DeployStep = Callable[[Deployment], Awaitable[None]]
+# Called with the jobs whose state changed, after each committed dispatcher transaction
+TransitionListener = Callable[[List[Deployment]], None]
+
+SIMULATED_DEPLOY_SECONDS = float(os.getenv("AETHER_SIMULATED_DEPLOY_SECONDS", "2"))
+
+# Steps also accept the job's vault credential when a CredentialCache is configured
+async def simulated_deploy(job: Deployment, credential: Optional[Credential] = None):
+    # Default step until real rollouts are wired in: takes as long as the old dashboard timer
+    await asyncio.sleep(SIMULATED_DEPLOY_SECONDS)
+
+async def noop_deploy(job: Deployment, credential: Optional[Credential] = None):
+    return None
+
+def with_credentials(cache: CredentialCache, step) -> DeployStep:
+    # The credential for job.vault_record_id is leased for the whole step; a vault error fails the job
+    async def deploy(job: Deployment):
+        async with cache.lease(job.vault_record_id) as credential:
+            await step(job, credential)
+    return deploy
+
+def load_deploy_step(path: str) -> DeployStep:
+    # "package.module:function", e.g. AETHER_DEPLOY_STEP=projects.aether_engine.api.jobs:noop_deploy
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+class JobEngine:
+    """Runs queued deployments from the Deployment table.
+
+    The table is the queue, so jobs survive restarts. One dispatcher task owns
+    every state change: in a single transaction per cycle it records finished
+    jobs and claims new ones, at most one per service (never two deploys of a
+    service at once) and never more than ``workers`` in flight. Worker tasks
+    only run the deploy step. Jobs left Deploying by a crash are re-queued on
+    start, so one engine must own a given database.
+    """
+
+    def __init__(self, engine: AsyncEngine, deploy_step: DeployStep = simulated_deploy, workers: int = 4,
+                 poll_interval: float = 1.0, deploy_timeout: float = 600.0,
+                 listener: Optional[TransitionListener] = None):
+        self.engine = engine
+        self.listener = listener
+        self.deploy_step = deploy_step
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.deploy_timeout = deploy_timeout
+        self._jobs: Optional[asyncio.Queue] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._finished: List[Deployment] = []
+        self._in_flight = 0
+        self._stopping = False
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+        self.cycles = 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._jobs = asyncio.Queue()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._in_flight = 0
+        self.recovered = await self._recover()
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0):
+        # Stop claiming, give running deploys a grace period, then record whatever has finished
+        if not self._tasks:
+            return
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        while self._in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._cycle(claim=0)
+
+    def notify(self):
+        # New job queued: wake the dispatcher instead of waiting for the next poll
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _recover(self) -> int:
+        now = datetime.utcnow()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(Deployment)
+                .where(Deployment.status == DEPLOYING)
+                .values(status=QUEUED, started_at=None, queued_at=func.coalesce(Deployment.queued_at, now))
+            )
+        if result.rowcount:
+            logger.warning("Re-queued %d deployments interrupted by a restart", result.rowcount)
+        return result.rowcount
+
+    async def _dispatch(self):
+        while True:
+            free = 0 if self._stopping else self.workers - self._in_flight
+            try:
+                claimed = await self._cycle(free)
+            except Exception as exc:
+                # The database may be briefly locked; finished results stay pending for the next cycle
+                logger.error("Job dispatch failed: %s", exc)
+                claimed = []
+            for job in claimed:
+                self._in_flight += 1
+                self._jobs.put_nowait(job)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _cycle(self, claim: int) -> List[Deployment]:
+        finished, self._finished = self._finished, []
+        if not finished and claim <= 0:
+            return []
+        now = datetime.utcnow()
+        try:
+            async with self.engine.begin() as conn:
+                if finished:
+                    # Only a Deploying job may finish; the guard keeps transitions one-way
+                    await conn.execute(
+                        update(Deployment)
+                        .where(Deployment.id == bindparam("job_id"), Deployment.status == DEPLOYING)
+                        .values(status=bindparam("new_status"), finished_at=bindparam("at"),
+                                last_run=bindparam("last_run"), error=bindparam("message")),
+                        [{"job_id": job.id, "new_status": job.status, "at": job.finished_at,
+                          "last_run": job.last_run, "message": job.error} for job in finished],
+                    )
+                rows = (await conn.execute(self._claim_statement(claim, now))).all() if claim > 0 else []
+        except Exception:
+            self._finished = finished + self._finished
+            raise
+        self.cycles += 1
+        self.started += len(rows)
+        # Full rows (as updated) so listeners see every column, not a partial snapshot
+        claimed = [Deployment.model_validate(dict(row._mapping)) for row in rows]
+        if self.listener is not None and (finished or claimed):
+            self.listener(finished + claimed)
+        return claimed
+
+    @staticmethod
+    def _claim_statement(limit: int, now: datetime):
+        # Oldest queued job per idle service, oldest first; one UPDATE ... RETURNING claims them atomically
+        busy = select(Deployment.service_name).where(Deployment.status == DEPLOYING)
+        oldest = (
+            select(func.min(Deployment.id))
+            .where(Deployment.status == QUEUED, Deployment.service_name.not_in(busy))
+            .group_by(Deployment.service_name)
+            .order_by(func.min(Deployment.id))
+            .limit(limit)
+        )
+        return (
+            update(Deployment)
+            .where(Deployment.id.in_(oldest), Deployment.status == QUEUED)
+            .values(status=DEPLOYING, started_at=now, attempts=Deployment.attempts + 1)
+            .returning(*Deployment.__table__.columns)
+        )
+
+    async def _work(self):
+        while True:
+            job = await self._jobs.get()
+            status, message = await self._run(job)
+            now = datetime.utcnow()
+            # The job object becomes the finished snapshot; the dispatcher commits it
+            job.status, job.error = status, message
+            job.finished_at, job.last_run = now, now.isoformat(timespec="seconds")
+            self._finished.append(job)
+            if status == SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self._in_flight -= 1
+            self._wake.set()
+
+    async def _run(self, job: Deployment) -> Tuple[str, str]:
+        try:
+            await asyncio.wait_for(self.deploy_step(job), self.deploy_timeout)
+            return SUCCEEDED, ""
+        except asyncio.TimeoutError:
+            return FAILED, f"deploy step timed out after {self.deploy_timeout:g}s"
+        except Exception as exc:
+            logger.warning("Deployment %s (%s) failed: %s", job.id, job.service_name, exc)
+            return FAILED, str(exc) or type(exc).__name__
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "started": self.started,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "recovered": self.recovered,
+            "pending_results": len(self._finished),
+            "cycles": self.cycles,
+        }
+
+def engine_from_env(engine: AsyncEngine, listener: Optional[TransitionListener] = None,
+                    credentials: Optional[CredentialCache] = None) -> JobEngine:
+    path = os.getenv("AETHER_DEPLOY_STEP")
+    step = load_deploy_step(path) if path else simulated_deploy
+    return JobEngine(
+        engine,
+        deploy_step=step if credentials is None else with_credentials(credentials, step),
+        workers=int(os.getenv("AETHER_DEPLOY_WORKERS", "4")),
+        poll_interval=float(os.getenv("AETHER_JOB_POLL_SECONDS", "1")),
+        deploy_timeout=float(os.getenv("AETHER_DEPLOY_TIMEOUT_SECONDS", "600")),
+        listener=listener,
+    )
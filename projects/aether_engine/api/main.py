@@ -1,45 +1,191 @@
+import asyncio
 import os
-import sys
-from fastapi import FastAPI, Depends
-from sqlmodel import SQLModel, Field, create_engine, Session, select
-from typing import List, Optional
+import signal
+import threading
+from datetime import datetime, timezone
+from fastapi import FastAPI, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Callable, List, Optional
 from contextlib import asynccontextmanager
+from .batches import BatchScheduler
+from .credentials import cache_from_env
+from .db import engine, get_session, init_db
+from .events import format_sse, hub_from_env
+from .jobs import engine_from_env
+from .models import QUEUED, TRANSITIONS, BatchDeployRequest, Deployment
+from .status import status_statement, summarize, summary_statement
+from ...common.metrics import MetricsMiddleware, MetricsRegistry, instrument_engine
 
 # Aether Engine depends on Cognis Vault for its secrets
 # This demonstrates real-world software supply chain and API-First interop
 
-DATABASE_URL = "sqlite:///./aether_engine.db"
-engine = create_engine(DATABASE_URL)
+# Keyset pagination limits for /status
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-class Deployment(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    service_name: str
-    status: str = "Idle"
-    last_run: str = ""
-    vault_record_id: int  # Link to Cognis Vault record ID
+# Idle /status/stream connections get a comment line this often so proxies keep them open
+SSE_KEEPALIVE_SECONDS = float(os.getenv("AETHER_SSE_KEEPALIVE_SECONDS", "15"))
+
+# Every state change is pushed to /status/stream subscribers
+event_hub = hub_from_env()
+
+def publish_transitions(deployments: List[Deployment]):
+    for deployment in deployments:
+        event_hub.publish("deployment", deployment.model_dump(mode="json"))
+
+# Deploy credentials are pulled from Cognis Vault once and cached (None: no vault account configured)
+credential_cache = cache_from_env()
+
+def on_transitions(deployments: List[Deployment]):
+    publish_transitions(deployments)
+    batch_scheduler.on_transitions(deployments)
+
+# Queued deployments are claimed and run by a bounded worker pool, one at a time per service
+job_engine = engine_from_env(engine, listener=on_transitions, credentials=credential_cache)
+
+# Batch deployments wait on their dependencies and are queued as those succeed
+batch_scheduler = BatchScheduler(engine, listener=publish_transitions, notify=job_engine.notify)
+
+def close_streams_on_exit_signal() -> Callable[[], None]:
+    # uvicorn waits for open responses to finish before the lifespan shutdown runs, so a connected
+    # /status/stream would hold it forever; end the streams as soon as the exit signal arrives.
+    # The server's own handler still runs; returns a function that restores it.
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    loop = asyncio.get_running_loop()
+    previous = {}
+
+    def handle(sig, frame):
+        loop.call_soon_threadsafe(event_hub.close)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        elif handler == signal.SIG_DFL:
+            signal.signal(sig, signal.SIG_DFL)
+            signal.raise_signal(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle)
+
+    def restore():
+        for sig, handler in previous.items():
+            if signal.getsignal(sig) is handle:
+                signal.signal(sig, handler)
+    return restore
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    await init_db()
+    await job_engine.start()
+    await batch_scheduler.resume()
+    restore_signals = close_streams_on_exit_signal()
     yield
+    restore_signals()
+    # Servers that run the lifespan shutdown first (or after cancelling requests) end the streams here
+    event_hub.close()
+    await job_engine.stop()
+    await batch_scheduler.stop()
+    if credential_cache is not None:
+        credential_cache.clear()
+        await credential_cache.sdk.aclose()
+    await engine.dispose()
 
 app = FastAPI(title="Aether DevOps Engine API", lifespan=lifespan)
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+# Prometheus metrics on /metrics: per-route latency and SQL timing
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+instrument_engine(engine, metrics)
 
 @app.post("/deploy")
-def trigger_deploy(service: str, vault_id: int, session: Session = Depends(get_session)):
-    # In a real app, this would use the Cognis SDK to pull keys
-    new_deploy = Deployment(service_name=service, status="Deploying", vault_record_id=vault_id)
+async def trigger_deploy(service: str, vault_id: int, session: AsyncSession = Depends(get_session)):
+    # Only enqueues; the job engine moves it through Deploying to Succeeded/Failed
+    new_deploy = Deployment(service_name=service, status=QUEUED, vault_record_id=vault_id,
+                            queued_at=datetime.utcnow())
     session.add(new_deploy)
-    session.commit()
-    return {"status": "triggered", "deployment_id": new_deploy.id}
+    await session.commit()
+    publish_transitions([new_deploy])
+    job_engine.notify()
+    return {"status": "queued", "deployment_id": new_deploy.id}
+
+@app.post("/deploy/batch")
+async def trigger_batch_deploy(request: BatchDeployRequest):
+    # Services whose dependencies have all succeeded run in parallel, up to max_parallel at a time;
+    # a failure skips only what depends on it
+    try:
+        batch, jobs = await batch_scheduler.create(request.services, request.max_parallel)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"status": "queued", "batch_id": batch.id,
+            "deployment_ids": {job.service_name: job.id for job in jobs}}
+
+@app.get("/deploy/batch/{batch_id}")
+async def get_batch(batch_id: int):
+    # Per-status counts, the critical path with its wait/run split, and every deployment of the batch
+    report = await batch_scheduler.report(batch_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return report
+
+@app.get("/deploy/{deployment_id}", response_model=Deployment)
+async def get_deployment(deployment_id: int, session: AsyncSession = Depends(get_session)):
+    deployment = await session.get(Deployment, deployment_id)
+    if deployment is None:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    return deployment
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC; aware query values are converted, naive ones taken as UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 @app.get("/status", response_model=List[Deployment])
-def get_all_status(session: Session = Depends(get_session)):
-    return session.exec(select(Deployment)).all()
+async def get_all_status(
+    service: Optional[str] = None,
+    status: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    # status may repeat (?status=Queued&status=Deploying); pass the last id of a page as after_id.
+    # Pages are in id order, or in queue-time order when since/until is given
+    unknown = set(status or ()) - set(TRANSITIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+    statement = status_statement(service, status, to_utc_naive(since), to_utc_naive(until), after_id, limit)
+    return (await session.exec(statement)).all()
+
+@app.get("/status/summary")
+async def get_status_summary(session: AsyncSession = Depends(get_session)):
+    # Counts per status and per service plus each service's latest deployment, without the history
+    return summarize((await session.exec(summary_statement())).all())
+
+@app.get("/status/stream")
+async def stream_status(last_event_id: Optional[str] = Header(None)):
+    # Server-Sent Events: one "deployment" event per state change. A client reconnecting with
+    # Last-Event-ID gets what it missed, or a "reset" event when that is no longer available.
+    subscription = event_hub.subscribe(last_event_id)
+
+    async def body():
+        yield "retry: 2000\n\n"
+        async for event in subscription.events(SSE_KEEPALIVE_SECONDS):
+            yield format_sse(event)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "jobs": job_engine.stats(),
+        "batches": batch_scheduler.stats(),
+        "events": event_hub.stats(),
+        "credentials": credential_cache.stats() if credential_cache is not None else None,
+    }
 
 if __name__ == "__main__":
     import uvicorn
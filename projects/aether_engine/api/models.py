@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlmodel import SQLModel, Field, Index
+
+# Deployment lifecycle: Queued -> Deploying -> Succeeded | Failed.
+# Deploying -> Queued only when a job interrupted by a restart is recovered.
+# Batch jobs start Waiting on their dependencies: Waiting -> Queued, or Skipped when one of them fails.
+WAITING = "Waiting"
+QUEUED = "Queued"
+DEPLOYING = "Deploying"
+SUCCEEDED = "Succeeded"
+FAILED = "Failed"
+SKIPPED = "Skipped"
+
+# A batch is Running until each of its jobs is Succeeded, Failed or Skipped
+RUNNING = "Running"
+
+TRANSITIONS = {
+    WAITING: (QUEUED, SKIPPED),
+    QUEUED: (DEPLOYING,),
+    DEPLOYING: (SUCCEEDED, FAILED, QUEUED),
+    SUCCEEDED: (),
+    FAILED: (),
+    SKIPPED: (),
+}
+
+class DeploymentBatch(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    status: str = RUNNING
+    max_parallel: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class Deployment(SQLModel, table=True):
+    # The job queue is this table: workers claim the oldest Queued job of a service with none Deploying
+    # (status, service_name), which also serves the status summary. The others back /status filters in id order,
+    # and time ranges in (queued_at, id) order.
+    __table_args__ = (
+        Index("ix_deployment_status_service_name", "status", "service_name"),
+        Index("ix_deployment_status_id", "status", "id"),
+        Index("ix_deployment_service_name_id", "service_name", "id"),
+        Index("ix_deployment_queued_at_id", "queued_at", "id"),
+        Index("ix_deployment_batch_id", "batch_id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    service_name: str
+    status: str = QUEUED
+    last_run: str = ""
+    vault_record_id: int  # Link to Cognis Vault record ID
+    # Transition timestamps (UTC); rows created before the job engine leave them empty
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    error: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    # Batch membership; depends_on holds the JSON list of upstream deployment ids in the same batch
+    batch_id: Optional[int] = Field(default=None, foreign_key="deploymentbatch.id")
+    depends_on: str = Field(default="", sa_column_kwargs={"server_default": ""})
+
+# /deploy/batch request body: dependencies are named by service within the batch
+class BatchService(SQLModel):
+    service: str = Field(min_length=1)
+    vault_id: int
+    depends_on: List[str] = []
+
+class BatchDeployRequest(SQLModel):
+    services: List[BatchService] = Field(min_length=1, max_length=1000)
+    max_parallel: int = Field(default=4, ge=1, le=64)
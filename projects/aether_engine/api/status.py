@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import and_, func, tuple_
+from sqlmodel import select
+from .models import Deployment
+
+def status_statement(service: Optional[str] = None, statuses: Optional[List[str]] = None,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None,
+                     after_id: Optional[int] = None, limit: int = 100):
+    # Keyset pagination over id, backed by (service_name, id) and (status, id). Time ranges
+    # ([since, until), by queue time) page over (queued_at, id) instead, so the (queued_at, id)
+    # index serves both the range and the order; after_id then resumes after that row's queue time
+    statement = select(Deployment)
+    if service is not None:
+        statement = statement.where(Deployment.service_name == service)
+    if statuses:
+        statement = statement.where(Deployment.status.in_(statuses))
+    if since is not None:
+        statement = statement.where(Deployment.queued_at >= since)
+    if until is not None:
+        statement = statement.where(Deployment.queued_at < until)
+    if since is None and until is None:
+        if after_id is not None:
+            statement = statement.where(Deployment.id > after_id)
+        return statement.order_by(Deployment.id).limit(limit)
+    if after_id is not None:
+        cursor = select(Deployment.queued_at).where(Deployment.id == after_id).scalar_subquery()
+        statement = statement.where(tuple_(Deployment.queued_at, Deployment.id) > tuple_(cursor, after_id))
+    return statement.order_by(Deployment.queued_at, Deployment.id).limit(limit)
+
+def summary_statement():
+    # One pass over the (status, service_name) index gives a count and the newest id per group;
+    # each service's newest row is joined onto the group that holds it, all in one query
+    groups = (
+        select(Deployment.status, Deployment.service_name,
+               func.count().label("count"), func.max(Deployment.id).label("last_id"))
+        .group_by(Deployment.status, Deployment.service_name)
+        .cte("status_groups")
+    )
+    peers = groups.alias("service_groups")
+    newest = select(func.max(peers.c.last_id)).where(peers.c.service_name == groups.c.service_name).scalar_subquery()
+    return (
+        select(groups.c.status, groups.c.service_name, groups.c.count, Deployment)
+        .outerjoin(Deployment, and_(Deployment.id == groups.c.last_id, groups.c.last_id == newest))
+        .order_by(groups.c.service_name)
+    )
+
+def summarize(rows: Iterable) -> dict:
+    by_status: Dict[str, int] = {}
+    services: Dict[str, dict] = {}
+    for status, service_name, count, latest in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        service = services.setdefault(service_name, {"service_name": service_name, "counts": {}, "latest": None})
+        service["counts"][status] = count
+        if latest is not None:
+            service["latest"] = latest
+    return {"total": sum(by_status.values()), "by_status": by_status, "services": list(services.values())}
@@ -1,6 +1,7 @@
 import sys
 import os
 import time
+import requests
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QTableWidget, 
                              QTableWidgetItem, QComboBox, QMessageBox)
@@ -13,14 +14,38 @@ if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
 from projects.cognis_vault.sdk.cognis_sdk import CognisSDK
+from projects.common.qt_tasks import TaskProgress, TaskRunner
+from projects.aether_engine.gui.status_stream import StatusStream
+
+# 凭证列表的本地密文缓存: 刷新时只拉取变更
+VAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".aether_engine", "vault_cache")
+AETHER_API_URL = os.getenv("AETHER_API_URL", "http://127.0.0.1:9000")
+FINAL_STATES = ("Succeeded", "Failed", "Skipped")
 
 class AetherDashboard(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Aether DevOps Engine - Powered by Cognis")
         self.resize(900, 600)
-        self.vault = CognisSDK("http://127.0.0.1:8888")
+        self.vault = CognisSDK("http://127.0.0.1:8888", cache_dir=VAULT_CACHE_DIR)
+        self.api = requests.Session()
+        # 部署 ID -> 状态表中的行号与最新状态
+        self.deploy_rows = {}
+        self.deploy_status = {}
+        # 网络请求与密钥派生放到后台线程池, 状态栏显示进度和取消按钮
+        self.tasks = TaskRunner(self)
+        self.statusBar().addPermanentWidget(TaskProgress(self.tasks, cancel_text="取消"))
         self.setup_ui()
+        # 状态变更由服务端推送 (SSE), 只更新发生变化的行
+        self.stream = StatusStream(AETHER_API_URL, self)
+        self.stream.deployment.connect(self.update_deployment)
+        self.stream.reset.connect(self.resync_status)
+        self.stream.start()
+
+    def closeEvent(self, event):
+        self.stream.stop()
+        self.tasks.shutdown()
+        super().closeEvent(event)
 
     def setup_ui(self):
         self.central = QWidget()
@@ -59,8 +84,18 @@ class AetherDashboard(QMainWindow):
         layout.addWidget(self.table)
 
     def connect_vault(self):
-        # 首先检查网络连接
+        # 连接过程中重复点击只会合并为一次后续尝试
+        self.tasks.submit(self._connect, key="connect", on_done=self.on_vault_connected,
+                          on_error=lambda e: QMessageBox.warning(self, "错误", f"连接 Cognis Vault 失败: {str(e)}"))
+
+    def _connect(self) -> str:
+        # 后台线程: 首先检查网络连接, 再尝试登录
         if not self.vault.check_connection():
+            return "offline"
+        return "ok" if self.vault.login("automated_user", "Aa123456") else "denied"
+
+    def on_vault_connected(self, state: str):
+        if state == "offline":
             QMessageBox.critical(
                 self, 
                 "网络连接错误", 
@@ -71,9 +106,8 @@ class AetherDashboard(QMainWindow):
                 "3. 防火墙没有阻止连接"
             )
             return
-        
-        # 尝试登录
-        if self.vault.login("automated_user", "Aa123456"):
+
+        if state == "ok":
             self.vault_status.setText("Vault Status: SECURE CONNECTION ESTABLISHED")
             self.vault_status.setStyleSheet("color: #50fa7b;")
             self.deploy_btn.setEnabled(True)
@@ -87,16 +121,20 @@ class AetherDashboard(QMainWindow):
             )
 
     def refresh_secrets(self):
+        # 正在刷新时再次请求只会排队一次, 旧结果被丢弃
+        self.tasks.submit(
+            lambda task: self.vault.list_secrets(fields=("id", "title", "service_type"), progress=task.report),
+            key="secrets", with_task=True, on_done=self.show_secrets,
+            on_error=lambda e: QMessageBox.warning(self, "错误", f"获取凭证列表失败: {str(e)}")
+        )
+
+    def show_secrets(self, secrets):
         self.secret_selector.clear()
-        try:
-            secrets = self.vault.list_secrets()
-            if not secrets:
-                self.secret_selector.addItem("没有可用的凭证", None)
-                return
-            for s in secrets:
-                self.secret_selector.addItem(f"{s['title']} ({s['service_type']})", s['id'])
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"获取凭证列表失败: {str(e)}")
+        if not secrets:
+            self.secret_selector.addItem("没有可用的凭证", None)
+            return
+        for s in secrets:
+            self.secret_selector.addItem(f"{s['title']} ({s['service_type']})", s['id'])
 
     def run_deploy(self):
         secret_id = self.secret_selector.currentData()
@@ -104,15 +142,56 @@ class AetherDashboard(QMainWindow):
             QMessageBox.warning(self, "错误", "请先选择一个有效的凭证")
             return
         
-        title = self.secret_selector.currentText()
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        self.table.setItem(row, 0, QTableWidgetItem(f"App_{title}"))
-        self.table.setItem(row, 1, QTableWidgetItem("In Progress..."))
-        self.table.setItem(row, 2, QTableWidgetItem(str(secret_id)))
-        
-        # Simulate background task
-        QTimer.singleShot(2000, lambda: self.table.setItem(row, 1, QTableWidgetItem("SUCCESS (Keys Pulled)")))
+        service = f"App_{self.secret_selector.currentText()}"
+        self.tasks.submit(self._trigger_deploy, service, secret_id,
+                          on_done=lambda deployment_id: self.update_deployment(
+                              {"id": deployment_id, "service_name": service, "vault_record_id": secret_id,
+                               "status": "Queued"}, only_new=True),
+                          on_error=lambda e: QMessageBox.warning(self, "错误", f"提交部署失败: {str(e)}"))
+
+    def _trigger_deploy(self, service: str, secret_id: int) -> int:
+        # 后台线程: 部署只是入队, 由 Aether 的任务引擎执行
+        response = self.api.post(f"{AETHER_API_URL}/deploy", params={"service": service, "vault_id": secret_id},
+                                 timeout=10)
+        response.raise_for_status()
+        return response.json()["deployment_id"]
+
+    def update_deployment(self, deployment: dict, only_new: bool = False):
+        deployment_id = deployment["id"]
+        row = self.deploy_rows.get(deployment_id)
+        if row is None:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(deployment["service_name"]))
+            self.table.setItem(row, 2, QTableWidgetItem(str(deployment["vault_record_id"])))
+            self.deploy_rows[deployment_id] = row
+        elif only_new:
+            # 推送事件比 /deploy 的响应先到, 行已是更新的状态
+            return
+        status = deployment["status"]
+        self.deploy_status[deployment_id] = status
+        if deployment.get("error"):
+            status = f"{status}: {deployment['error']}"
+        self.table.setItem(row, 1, QTableWidgetItem(status))
+
+    def resync_status(self):
+        # 服务端无法补发断线期间的事件: 重新拉取尚未结束的部署
+        pending = sorted(i for i, status in self.deploy_status.items() if status not in FINAL_STATES)
+        if pending:
+            self.tasks.submit(self._fetch_status, pending, key="status", on_done=self.show_status,
+                              on_error=lambda e: QMessageBox.warning(self, "错误", f"获取部署状态失败: {str(e)}"))
+
+    def _fetch_status(self, deployment_ids):
+        statuses = {}
+        for deployment_id in deployment_ids:
+            response = self.api.get(f"{AETHER_API_URL}/deploy/{deployment_id}", timeout=10)
+            response.raise_for_status()
+            statuses[deployment_id] = response.json()
+        return statuses
+
+    def show_status(self, statuses):
+        for deployment in statuses.values():
+            self.update_deployment(deployment)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,89 @@
+import json
+import threading
+from typing import Optional
+import requests
+from PySide6.QtCore import QObject, Signal
+
+class StatusStream(QObject):
+    """订阅 Aether 的 /status/stream (SSE); 后台线程读取事件, 通过信号在 GUI 线程中交付.
+    断线后带 Last-Event-ID 自动重连; 服务端无法补发时发出 reset, 界面需自行重新拉取状态"""
+
+    deployment = Signal(dict)
+    reset = Signal()
+    connected = Signal(bool)
+
+    def __init__(self, base_url: str, parent: Optional[QObject] = None, retry_seconds: float = 2.0):
+        super().__init__(parent)
+        self.url = f"{base_url}/status/stream"
+        self.retry_seconds = retry_seconds
+        self.last_event_id: Optional[str] = None
+        self._stop = threading.Event()
+        self._response = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # 守护线程: 阻塞的读取不会拖住程序退出
+        self._thread = threading.Thread(target=self._run, name="aether-status-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except (requests.RequestException, RuntimeError, AttributeError):
+                # RuntimeError/AttributeError: 连接在 stop() 中被关闭, 或信号接收方已销毁
+                pass
+            if self._stop.is_set():
+                break
+            self._emit(self.connected, False)
+            self._stop.wait(self.retry_seconds)
+
+    def _listen(self):
+        headers = {"Accept": "text/event-stream"}
+        if self.last_event_id:
+            headers["Last-Event-ID"] = self.last_event_id
+        # 读超时需大于服务端心跳间隔
+        with requests.get(self.url, headers=headers, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            self._response = response
+            self._emit(self.connected, True)
+            event_id, name, data = None, "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if self._stop.is_set():
+                    return
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value[1:] if value.startswith(" ") else value
+                    if field == "id":
+                        event_id = value
+                    elif field == "event":
+                        name = value
+                    elif field == "data":
+                        data.append(value)
+                    elif field == "retry" and value.isdigit():
+                        self.retry_seconds = int(value) / 1000
+                    continue
+                # 空行: 一个事件结束
+                if data:
+                    self._dispatch(name, "\n".join(data))
+                if event_id is not None:
+                    self.last_event_id = event_id
+                event_id, name, data = None, "message", []
+
+    def _dispatch(self, name: str, data: str):
+        if name == "deployment":
+            self._emit(self.deployment, json.loads(data))
+        elif name == "reset":
+            self._emit(self.reset)
+
+    def _emit(self, signal, *args):
+        if not self._stop.is_set():
+            signal.emit(*args)
@@ -0,0 +1,117 @@
+"""
+Batch deploy benchmark: a dependency DAG of --services services vs one-by-one deploys.
+
+Builds a layered stack (--layers layers; each service depends on up to
+--fan-in services of the layer below) in a temp database and runs it through
+BatchScheduler and JobEngine with --step-ms of simulated work per deploy. The
+step checks that no service starts before its dependencies succeeded and that
+at most --max-parallel run at once. With --fail, one service of the second
+layer fails and only its downstream must be skipped.
+
+Reports the batch wall time against the sum of deploy times (what sequential
+calls would take) and the critical path from the batch report.
+
+    python projects/aether_engine/tests/bench_batch.py --services 40 --layers 5 --max-parallel 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from projects.common.bench import temp_database_url
+os.environ["AETHER_DATABASE_URL"] = temp_database_url()
+
+from projects.aether_engine.api.batches import BatchScheduler
+from projects.aether_engine.api.db import engine, init_db
+from projects.aether_engine.api.jobs import JobEngine
+from projects.aether_engine.api.models import RUNNING, SKIPPED, BatchService, Deployment
+
+def build_stack(services: int, layers: int, fan_in: int, rng: random.Random):
+    names = [f"svc_{i:03d}" for i in range(services)]
+    per_layer = max(1, services // layers)
+    stack = []
+    for i, name in enumerate(names):
+        layer = min(i // per_layer, layers - 1)
+        below = names[max(0, (layer - 1) * per_layer):layer * per_layer] if layer else []
+        stack.append(BatchService(service=name, vault_id=i, depends_on=rng.sample(below, min(fan_in, len(below)))))
+    rng.shuffle(stack)
+    return stack, per_layer
+
+class OrderedStep:
+    """Deploy step that records violations of dependency order or the batch concurrency limit"""
+
+    def __init__(self, stack, step_ms: float, failing: str = ""):
+        self.depends_on = {item.service: item.depends_on for item in stack}
+        self.delay = step_ms / 1000
+        self.failing = failing
+        self.succeeded = set()
+        self.running = 0
+        self.max_parallel = 0
+        self.violations = 0
+
+    async def __call__(self, job: Deployment):
+        if not set(self.depends_on[job.service_name]) <= self.succeeded:
+            self.violations += 1
+        self.running += 1
+        self.max_parallel = max(self.max_parallel, self.running)
+        try:
+            await asyncio.sleep(self.delay * random.uniform(0.5, 1.5))
+            if job.service_name == self.failing:
+                raise RuntimeError("simulated failure")
+        finally:
+            self.running -= 1
+        self.succeeded.add(job.service_name)
+
+async def run(args):
+    await init_db()
+    rng = random.Random(7)
+    stack, per_layer = build_stack(args.services, args.layers, args.fan_in, rng)
+    failing = f"svc_{per_layer:03d}" if args.fail and args.layers > 1 else ""
+    step = OrderedStep(stack, args.step_ms, failing)
+    # More workers than the batch limit: max_parallel alone must bound the batch
+    jobs = JobEngine(engine, deploy_step=step, workers=64, poll_interval=0.5)
+    batches = BatchScheduler(engine, notify=jobs.notify)
+    jobs.listener = batches.on_transitions
+    await jobs.start()
+
+    started = time.perf_counter()
+    batch, _ = await batches.create(stack, args.max_parallel)
+    while (report := await batches.report(batch.id))["status"] == RUNNING:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await jobs.stop()
+    await batches.stop()
+
+    timing = report["timing"]
+    print(f"=== Batch deploy ({args.services} services, {args.layers} layers, fan-in {args.fan_in}, "
+          f"max parallel {args.max_parallel}, step ~{args.step_ms:g} ms) ===")
+    print(f"batch {report['status']} in {elapsed:.2f}s; one-by-one would take ~{timing['total_deploy_seconds']:.2f}s "
+          f"(x{timing['parallelism']:.1f} parallelism)")
+    print(f"counts {report['counts']}; max running {step.max_parallel}, dependency violations {step.violations}")
+    print(f"critical path: {len(report['critical_path'])} steps, run {timing['critical_path_run_seconds']:.2f}s, "
+          f"wait {timing['critical_path_wait_seconds']:.2f}s")
+    for hop in report["critical_path"]:
+        print(f"  {hop['service_name']:<8} {hop['status']:<9} slot wait {hop['slot_wait_seconds'] or 0:6.3f}s  "
+              f"queue wait {hop['queue_wait_seconds'] or 0:6.3f}s  run {hop['run_seconds'] or 0:6.3f}s")
+    if failing:
+        skipped = [job.service_name for job in report["deployments"] if job.status == SKIPPED]
+        print(f"{failing} failed; skipped downstream: {len(skipped)}")
+    await engine.dispose()
+    if step.violations or step.max_parallel > args.max_parallel:
+        raise SystemExit("dependency order or concurrency limit violated")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=40)
+    parser.add_argument("--layers", type=int, default=5)
+    parser.add_argument("--fan-in", type=int, default=2)
+    parser.add_argument("--max-parallel", type=int, default=8)
+    parser.add_argument("--step-ms", type=float, default=200.0, help="mean simulated deploy time")
+    parser.add_argument("--fail", action="store_true", help="fail one service of the second layer")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Credential fetch benchmark: naive per-deploy vault access vs Aether's CredentialCache.
+
+Starts the Cognis Vault API with uvicorn (temp database) and stores --records
+deploy credentials. It then runs --deploys concurrent deploys (at most
+--concurrency at a time), each needing the credential of a random record:
+
+  naive   every deploy logs in (Argon2 on the server, PBKDF2 on the client)
+          and lists all secrets to find its record
+  cached  one shared CredentialCache: a single login, one fetch per record
+          (concurrent misses share it), hits afterwards
+
+Reports wall time, vault logins and fetches, and checks that every deploy saw
+the right secret and that evicted secrets were zeroed.
+
+    python projects/aether_engine/tests/bench_credentials.py --deploys 200 --records 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from projects.common.bench import ROOT, free_port
+sys.path.insert(0, os.path.join(ROOT, "projects", "cognis_vault", "tests"))
+
+from bench_sdk_http import start_server
+from projects.aether_engine.api.credentials import CredentialCache
+from projects.cognis_vault.sdk.cognis_async_sdk import AsyncCognisSDK
+
+USERNAME = "automated_user"
+PASSWORD = "Aa123456"
+
+async def seed(url: str, records: int) -> dict:
+    async with AsyncCognisSDK(url) as sdk:
+        await sdk.register(USERNAME, PASSWORD)
+        await sdk.login(USERNAME, PASSWORD)
+        ids = await sdk.add_secrets((f"service_{i}", "SSH", f"key-material-{i}") for i in range(records))
+    return {record_id: f"key-material-{i}" for i, record_id in enumerate(ids)}
+
+async def run_naive(url: str, targets, expected: dict, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    wrong = rejected = 0
+
+    async def deploy(record_id):
+        nonlocal wrong, rejected
+        async with limit, AsyncCognisSDK(url, timeout=60) as sdk:
+            # Concurrent logins saturate the server's Argon2 pool (503 + Retry-After); back off like a client would
+            for _ in range(60):
+                if await sdk.login(USERNAME, PASSWORD):
+                    break
+                rejected += 1
+                await asyncio.sleep(1)
+            else:
+                raise RuntimeError("login failed")
+            secrets = await sdk.list_secrets()
+            payload = next(s["payload"] for s in secrets if s["id"] == record_id)
+            wrong += payload != expected[record_id]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deploy(record_id) for record_id in targets))
+    return time.perf_counter() - started, wrong, rejected
+
+async def run_cached(url: str, targets, expected: dict, concurrency: int, cache_size: int):
+    limit = asyncio.Semaphore(concurrency)
+    wrong = 0
+    async with AsyncCognisSDK(url, timeout=60) as sdk:
+        cache = CredentialCache(sdk, USERNAME, PASSWORD, ttl=300, max_entries=cache_size)
+        evicted = []
+
+        async def deploy(record_id):
+            nonlocal wrong
+            async with limit, cache.lease(record_id) as credential:
+                wrong += credential.secret.decode() != expected[record_id]
+                evicted.append(credential)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(deploy(record_id) for record_id in targets))
+        elapsed = time.perf_counter() - started
+        cache.clear()
+    zeroed = all(not credential.secret for credential in evicted)
+    return elapsed, wrong, cache.stats(), zeroed
+
+async def run(args, url: str):
+    expected = await seed(url, args.records)
+    rng = random.Random(7)
+    targets = [rng.choice(list(expected)) for _ in range(args.deploys)]
+
+    print(f"=== Credential fetch ({args.deploys} deploys over {args.records} records, "
+          f"concurrency {args.concurrency}) ===")
+    naive_elapsed, naive_wrong, rejected = await run_naive(url, targets, expected, args.concurrency)
+    print(f"naive : {naive_elapsed:6.2f}s  vault logins {args.deploys} (+{rejected} rejected as busy)  "
+          f"full listings {args.deploys}  wrong {naive_wrong}")
+    cached_elapsed, cached_wrong, stats, zeroed = await run_cached(
+        url, targets, expected, args.concurrency, args.cache_size)
+    print(f"cached: {cached_elapsed:6.2f}s  vault logins {stats['logins']}  record fetches {stats['misses']}  "
+          f"shared {stats['shared_loads']}  hits {stats['hits']}  evictions {stats['evictions']}  wrong {cached_wrong}")
+    print(f"speedup x{naive_elapsed / cached_elapsed:.1f}; evicted secrets zeroed: {zeroed}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deploys", type=int, default=200)
+    parser.add_argument("--records", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Throughput benchmark for the Aether deployment job engine.
+
+Queues --jobs deployments spread over --services services in a temp
+database, then drains them with JobEngine and a pluggable deploy step: a
+no-op by default, or --step-ms of simulated work. The step checks that no
+service ever has two deploys running at once. Reports jobs/s, queue-wait
+and end-to-end latency percentiles from the recorded transition
+timestamps, and the number of dispatcher transactions.
+
+    python projects/aether_engine/tests/bench_jobs.py --jobs 5000 --services 50 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from projects.common.bench import percentile, temp_database_url
+os.environ["AETHER_DATABASE_URL"] = temp_database_url()
+
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from projects.aether_engine.api.db import engine, init_db
+from projects.aether_engine.api.jobs import JobEngine
+from projects.aether_engine.api.models import QUEUED, SUCCEEDED, Deployment
+
+class CheckedStep:
+    """Deploy step that fails the benchmark if a service is ever deployed twice concurrently"""
+
+    def __init__(self, step_ms: float):
+        self.delay = step_ms / 1000
+        self.running = Counter()
+        self.max_parallel = 0
+        self.overlaps = 0
+
+    async def __call__(self, job: Deployment):
+        self.running[job.service_name] += 1
+        if self.running[job.service_name] > 1:
+            self.overlaps += 1
+        self.max_parallel = max(self.max_parallel, sum(self.running.values()))
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.running[job.service_name] -= 1
+
+async def run(args):
+    await init_db()
+    now = datetime.utcnow()
+    async with engine.begin() as conn:
+        await conn.execute(insert(Deployment), [
+            {"service_name": f"service_{i % args.services}", "status": QUEUED, "last_run": "",
+             "vault_record_id": i, "queued_at": now, "attempts": 0, "error": ""}
+            for i in range(args.jobs)
+        ])
+
+    step = CheckedStep(args.step_ms)
+    jobs = JobEngine(engine, deploy_step=step, workers=args.workers, poll_interval=0.5)
+    started = time.perf_counter()
+    await jobs.start()
+    while jobs.succeeded + jobs.failed < args.jobs:
+        await asyncio.sleep(0.01)
+    await jobs.stop()
+    elapsed = time.perf_counter() - started
+
+    async with AsyncSession(engine) as session:
+        rows = (await session.exec(select(Deployment))).all()
+    done = [r for r in rows if r.status == SUCCEEDED]
+    waits = [(r.started_at - r.queued_at).total_seconds() * 1000 for r in done]
+    totals = [(r.finished_at - r.queued_at).total_seconds() * 1000 for r in done]
+    stats = jobs.stats()
+
+    print(f"=== Job Engine ({args.jobs} jobs, {args.services} services, {args.workers} workers, "
+          f"step {args.step_ms:g} ms) ===")
+    print(f"drained in {elapsed:.2f}s = {args.jobs / elapsed:.0f} jobs/s "
+          f"({stats['cycles']} dispatcher transactions)")
+    print(f"succeeded {len(done)}/{args.jobs}, max parallel {step.max_parallel}, "
+          f"per-service overlaps {step.overlaps}")
+    print(f"queue wait ms: p50 {percentile(waits, 50):.0f}  p95 {percentile(waits, 95):.0f}  "
+          f"max {max(waits, default=0):.0f}")
+    print(f"queued->finished ms: p50 {percentile(totals, 50):.0f}  p95 {percentile(totals, 95):.0f}")
+    await engine.dispose()
+    if step.overlaps or len(done) != args.jobs:
+        raise SystemExit("per-service limit violated or jobs left unfinished")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--services", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--step-ms", type=float, default=0.0, help="simulated deploy time (0: no-op)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, false, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .db import write_lock
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+class _Event:
+    __slots__ = ("row", "waiter")
+
+    def __init__(self, row: Optional[dict], waiter: Optional[asyncio.Future] = None):
+        self.row = row  # None marks a flush barrier
+        self.waiter = waiter
+
+class AuditSink:
+    """Write-behind audit log: events are queued in memory and group-committed.
+
+    A batch is written when ``batch_size`` events are pending, when a durable
+    event or flush barrier arrives, or ``flush_interval`` seconds after the
+    first queued event, always as one transaction. ``emit(..., durable=True)``
+    returns only after its batch has committed. ``stop()`` drains everything
+    queued, including events emitted while it runs; later events are written inline.
+
+    Rows are timestamped when their batch is written, with the database write
+    lock held, so (timestamp, id) follows commit order across API worker
+    processes and a keyset cursor never passes a row that commits later.
+    ``flush()`` only drains this process's queue: another worker's
+    non-durable events show up once that worker flushes (``flush_interval``).
+    """
+
+    WRITE_ATTEMPTS = 3
+
+    def __init__(self, engine: AsyncEngine, batch_size: int = 500, flush_interval: float = 0.05,
+                 max_queue: int = 100_000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._urgent: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Queued events someone is waiting on (durable emits, flush barriers)
+        self._waiters = 0
+        self.events_written = 0
+        self.events_dropped = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._urgent = asyncio.Event()
+        self._stopping = False
+        self._waiters = 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Drain: the writer exits once the queue is empty after the stop request; the None
+        # sentinel only wakes it if it is idle
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        self._urgent.set()
+        await self._task
+        self._task = None
+
+    async def emit(self, user_id: int, action: str, ip_address: Optional[str] = None, durable: bool = False):
+        await self._submit([{"user_id": user_id, "action": action, "ip_address": ip_address}], durable)
+
+    async def emit_many(self, user_id: int, actions: Iterable[str], durable: bool = False):
+        await self._submit([{"user_id": user_id, "action": action, "ip_address": None} for action in actions], durable)
+
+    async def flush(self):
+        # Barrier: returns once every event queued before this call is committed
+        if self._running():
+            await self._enqueue([_Event(None, asyncio.get_running_loop().create_future())], durable=True)
+
+    async def _submit(self, rows: List[dict], durable: bool):
+        if not self._running():
+            # Not started (e.g. scripts without lifespan) or already drained: write inline
+            await self._write([_Event(row) for row in rows])
+            return
+        events = [_Event(row) for row in rows]
+        if durable:
+            events[-1].waiter = asyncio.get_running_loop().create_future()
+        await self._enqueue(events, durable)
+
+    def _running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _enqueue(self, events: List[_Event], durable: bool):
+        for event in events:
+            if event.waiter is not None:
+                self._waiters += 1
+            await self._queue.put(event)
+        if durable or self._queue.qsize() >= self.batch_size:
+            self._urgent.set()
+        if events[-1].waiter is not None:
+            await events[-1].waiter
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            # Checked per batch: a durable event left behind by a full batch must not wait for the timer
+            urgent = self._stopping or self._waiters or self._queue.qsize() + 1 >= self.batch_size
+            if not (urgent or self._urgent.is_set()):
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._urgent.clear()
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._waiters -= sum(1 for event in batch if event is not None and event.waiter is not None)
+            await self._write([event for event in batch if event is not None])
+            if self._stopping and self._queue.empty():
+                return
+
+    async def _write(self, batch: List[_Event]):
+        rows = [event.row for event in batch if event.row is not None]
+        error: Optional[Exception] = None
+        started = time.perf_counter()
+        for attempt in range(self.WRITE_ATTEMPTS if rows else 0):
+            try:
+                async with AsyncSession(self.engine) as session, write_lock():
+                    # Take the write lock (a no-op DELETE) before reading the clock: no other worker can
+                    # commit between the timestamp and this commit, so timestamps follow commit order
+                    await session.execute(delete(AuditLog).where(false()))
+                    now = datetime.utcnow()
+                    await session.execute(insert(AuditLog), [dict(row, timestamp=now) for row in rows])
+                    await session.commit()
+                error = None
+                break
+            except Exception as exc:
+                error = exc
+                await asyncio.sleep(0.05 * 2 ** attempt)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if error is not None:
+            self.events_dropped += len(rows)
+            logger.error("Dropped %d audit events after %d attempts: %s", len(rows), self.WRITE_ATTEMPTS, error)
+        elif rows:
+            self.events_written += len(rows)
+            self.batches += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+        for event in batch:
+            if event.waiter is not None and not event.waiter.done():
+                if error is None:
+                    event.waiter.set_result(None)
+                else:
+                    event.waiter.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batches": self.batches,
+            "events_written": self.events_written,
+            "events_dropped": self.events_dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+def sink_from_env(engine: AsyncEngine) -> AuditSink:
+    return AuditSink(
+        engine,
+        batch_size=int(os.getenv("COGNIS_AUDIT_BATCH_SIZE", "500")),
+        flush_interval=int(os.getenv("COGNIS_AUDIT_FLUSH_MS", "50")) / 1000,
+        max_queue=int(os.getenv("COGNIS_AUDIT_QUEUE_MAX", "100000")),
+    )
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .db import reserve_ids, write_lock
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width timestamps so string order equals time order inside block keys
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+BLOCK_ROWS = 1000
+RETENTION_CHUNK = 20_000
+SQLITE_MAX_PARAMS = 900
+
+def month_start(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(ts: datetime) -> datetime:
+    start = month_start(ts)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+class AuditArchive:
+    """Monthly, append-only, compressed audit partitions.
+
+    Each month is a ``YYYY-MM.blk`` file of zlib-compressed NDJSON blocks plus a
+    ``YYYY-MM.idx`` block index (offset, length, first/last ``(user_id, ts, id)``
+    key, id range). Rows inside a block are sorted by that key, so a user's
+    time-range query only decompresses the blocks whose key range overlaps it.
+    Retention moves rows in id order, so the highest archived id of a month is a
+    high-water mark: ``append`` skips rows at or below it, which makes re-moving
+    rows whose hot-table delete never committed a no-op.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, Tuple[float, List[dict]]] = {}
+        self.archived_events = 0
+        self.last_run: Optional[dict] = None
+
+    def months(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith(".idx"))
+
+    def append(self, month: str, rows: List[list]) -> int:
+        # rows: [id, user_id, action, ip_address, timestamp]; data is fsynced before the index references it.
+        # Returns how many rows were new (not already archived by an earlier, interrupted run)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            high_water = self.max_id(month)
+            rows = sorted((r for r in rows if r[0] > high_water), key=lambda r: (r[1], r[4], r[0]))
+            if not rows:
+                return 0
+            self._write(month, rows)
+        return len(rows)
+
+    def max_id(self, month: str) -> int:
+        if not os.path.exists(self._path(month, "idx")):
+            return 0
+        return max((entry["max_id"] for entry in self._index(month)), default=0)
+
+    def highest_id(self) -> int:
+        return max((self.max_id(month) for month in self.months()), default=0)
+
+    def _write(self, month: str, rows: List[list]):
+        with open(self._path(month, "blk"), "ab") as data_file:
+            entries = []
+            for start in range(0, len(rows), BLOCK_ROWS):
+                block = rows[start:start + BLOCK_ROWS]
+                payload = zlib.compress("\n".join(json.dumps(r) for r in block).encode(), 6)
+                offset = data_file.seek(0, os.SEEK_END)
+                data_file.write(payload)
+                entries.append({
+                    "offset": offset,
+                    "length": len(payload),
+                    "count": len(block),
+                    "first": [block[0][1], block[0][4], block[0][0]],
+                    "last": [block[-1][1], block[-1][4], block[-1][0]],
+                    "min_id": min(r[0] for r in block),
+                    "max_id": max(r[0] for r in block),
+                })
+            data_file.flush()
+            os.fsync(data_file.fileno())
+            self._truncate_torn_index(month)
+            with open(self._path(month, "idx"), "a") as index_file:
+                index_file.writelines(json.dumps(entry) + "\n" for entry in entries)
+                index_file.flush()
+                os.fsync(index_file.fileno())
+            self._indexes.pop(month, None)
+
+    def query(self, user_id: int, since: Optional[datetime], until: Optional[datetime],
+              after: Optional[Tuple[datetime, int]], limit: int) -> List[AuditLog]:
+        # Ordered by (timestamp, id) like the hot table; months outside the range are never opened
+        lo = (user_id, since.strftime(TS_FORMAT) if since else "")
+        hi = (user_id, until.strftime(TS_FORMAT) if until else "\uffff")
+        after_key = (after[0].strftime(TS_FORMAT), after[1]) if after else None
+        results: List[AuditLog] = []
+        for month in self.months():
+            start = datetime.strptime(month, "%Y-%m")
+            if (until and start >= until) or (since and next_month(start) <= since):
+                continue
+            if after and next_month(start) <= after[0]:
+                continue
+            # A user's rows are sorted within each append, not across appends, so blocks are read in order of
+            # the lowest key they can hold for this user and reading stops once no unread block can beat the page
+            candidates = []
+            for entry in self._index(month):
+                first, last = entry["first"], entry["last"]
+                if (first[0], first[1]) > hi or (last[0], last[1]) < lo:
+                    continue
+                # A block that starts or ends with another user is open-ended on that side
+                low = (first[1], first[2]) if first[0] == user_id else ("", 0)
+                high = (last[1], last[2]) if last[0] == user_id else ("\uffff", 0)
+                if after_key is not None and high <= after_key:
+                    continue
+                candidates.append((low, entry))
+            candidates.sort(key=lambda c: c[0])
+            need = limit - len(results)
+            rows: List[list] = []
+            for low, entry in candidates:
+                if len(rows) >= need and low >= (rows[need - 1][4], rows[need - 1][0]):
+                    break
+                rows.extend(
+                    row for row in self._read_block(month, entry)
+                    if row[1] == user_id and lo[1] <= row[4] < hi[1] and (after_key is None or (row[4], row[0]) > after_key)
+                )
+                rows.sort(key=lambda r: (r[4], r[0]))
+                del rows[need:]
+            results.extend(self._to_model(row) for row in rows)
+            if len(results) >= limit:
+                break
+        return results
+
+    def find(self, user_id: int, row_id: int) -> Optional[AuditLog]:
+        for month in reversed(self.months()):
+            for entry in self._index(month):
+                if entry["first"][0] <= user_id <= entry["last"][0] and entry["min_id"] <= row_id <= entry["max_id"]:
+                    for row in self._read_block(month, entry):
+                        if row[0] == row_id and row[1] == user_id:
+                            return self._to_model(row)
+        return None
+
+    def stats(self) -> dict:
+        months = self.months()
+        return {
+            "partitions": len(months),
+            "oldest": months[0] if months else None,
+            "newest": months[-1] if months else None,
+            "archived_events": self.archived_events,
+            "last_run": self.last_run,
+        }
+
+    def _path(self, month: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{month}.{ext}")
+
+    def _index(self, month: str) -> List[dict]:
+        path = self._path(month, "idx")
+        mtime = os.path.getmtime(path)
+        cached = self._indexes.get(month)
+        if cached is None or cached[0] != mtime:
+            with open(path) as index_file:
+                cached = (mtime, self._parse_index(index_file.read(), path))
+            self._indexes[month] = cached
+        return cached[1]
+
+    @staticmethod
+    def _parse_index(text: str, path: str) -> List[dict]:
+        # A crash mid-append can leave a torn last line; its block is simply not archived yet (the rows are
+        # still in the hot table), so the line is ignored here and cut off before the next append
+        lines = text.split("\n")
+        torn = lines.pop() if not text.endswith("\n") else ""
+        if torn.strip():
+            logger.warning("Ignoring incomplete last line of %s", path)
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _truncate_torn_index(self, month: str):
+        path = self._path(month, "idx")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as index_file:
+            data = index_file.read()
+            if data and not data.endswith(b"\n"):
+                index_file.truncate(data.rfind(b"\n") + 1)
+
+    def _read_block(self, month: str, entry: dict) -> List[list]:
+        with open(self._path(month, "blk"), "rb") as data_file:
+            data_file.seek(entry["offset"])
+            payload = zlib.decompress(data_file.read(entry["length"]))
+        return [json.loads(line) for line in payload.decode().split("\n")]
+
+    @staticmethod
+    def _to_model(row: list) -> AuditLog:
+        return AuditLog(id=row[0], user_id=row[1], action=row[2], ip_address=row[3],
+                        timestamp=datetime.strptime(row[4], TS_FORMAT))
+
+async def enforce_retention(engine: AsyncEngine, archive: AuditArchive, hot_days: int) -> int:
+    # Whole months older than the hot window move to the archive, oldest rows first. A run that
+    # stopped between archiving a chunk and deleting it re-reads those rows; append skips them.
+    cutoff = month_start(datetime.utcnow() - timedelta(days=hot_days))
+    started, moved, archived = time.perf_counter(), 0, 0
+    while True:
+        async with AsyncSession(engine) as session:
+            statement = select(AuditLog).where(AuditLog.timestamp < cutoff).order_by(AuditLog.id).limit(RETENTION_CHUNK)
+            logs = (await session.exec(statement)).all()
+        if not logs:
+            break
+        by_month: Dict[str, List[list]] = {}
+        for log in logs:
+            by_month.setdefault(log.timestamp.strftime("%Y-%m"), []).append(
+                [log.id, log.user_id, log.action, log.ip_address, log.timestamp.strftime(TS_FORMAT)]
+            )
+        for month, rows in by_month.items():
+            archived += await asyncio.to_thread(archive.append, month, rows)
+        ids = [log.id for log in logs]
+        async with AsyncSession(engine) as session, write_lock():
+            for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+                await session.execute(delete(AuditLog).where(AuditLog.id.in_(ids[start:start + SQLITE_MAX_PARAMS])))
+            await session.commit()
+        moved += len(logs)
+    archive.archived_events += archived
+    archive.last_run = {
+        "at": datetime.utcnow().isoformat(),
+        "cutoff": cutoff.isoformat(),
+        "moved": moved,
+        "already_archived": moved - archived,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return moved
+
+async def reserve_archived_ids(engine: AsyncEngine, archive: AuditArchive):
+    # A database that reused ids before AUTOINCREMENT was declared may have fallen behind the archive;
+    # new rows must not take ids an archived row (and a client cursor) already has
+    highest = await asyncio.to_thread(archive.highest_id)
+    if highest and engine.dialect.name == "sqlite":
+        async with engine.begin() as conn:
+            await conn.run_sync(reserve_ids, AuditLog.__tablename__, highest)
+
+async def retention_loop(engine: AsyncEngine, archive: AuditArchive, hot_days: int, interval: float):
+    while True:
+        try:
+            await enforce_retention(engine, archive, hot_days)
+        except Exception:
+            logger.exception("Audit retention run failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import weakref
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+from .models import FernetToken
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .search import ensure_search_index
+
+DATABASE_URL = os.getenv("COGNIS_DATABASE_URL", "sqlite+aiosqlite:///./cognis_vault.db")
+
+# Readers each hold a pooled connection; WAL lets them run alongside the single writer
+POOL_SIZE = int(os.getenv("COGNIS_DB_POOL_SIZE", "8"))
+MAX_OVERFLOW = int(os.getenv("COGNIS_DB_MAX_OVERFLOW", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("COGNIS_DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KIB = int(os.getenv("COGNIS_DB_CACHE_SIZE_KIB", "32768"))
+
+def build_engine(url: str) -> AsyncEngine:
+    # Plain sqlite:/// URLs (older configs) are upgraded to the aiosqlite driver
+    if url.startswith("sqlite:///"):
+        url = "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    async_engine = create_async_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def configure_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode; only power loss can drop the last commits
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return async_engine
+
+engine = build_engine(DATABASE_URL)
+
+_write_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+def write_lock() -> asyncio.Lock:
+    # SQLite admits one writer at a time; queueing writers here instead of in the
+    # busy handler (which sleeps with backoff) keeps write tail latency flat
+    loop = asyncio.get_running_loop()
+    lock = _write_locks.get(loop)
+    if lock is None:
+        lock = _write_locks[loop] = asyncio.Lock()
+    return lock
+
+def ensure_indexes(connection):
+    # create_all skips existing tables, so indexes added later must be created explicitly
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def ensure_columns(connection):
+    # create_all skips existing tables too; columns added later need a server default to be appended
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                spec = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {spec}")
+
+def ensure_autoincrement(connection):
+    # AUTOINCREMENT cannot be added with ALTER TABLE; tables created before it was declared are
+    # rebuilt once (rows keep their ids, and sqlite_sequence starts at the highest of them)
+    for table in SQLModel.metadata.sorted_tables:
+        if not table.kwargs.get("sqlite_autoincrement"):
+            continue
+        sql = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)).scalar()
+        if sql is None or "AUTOINCREMENT" in sql.upper():
+            continue
+        legacy = f"{table.name}_legacy"
+        connection.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {legacy}")
+        for (index,) in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (legacy,)).all():
+            connection.exec_driver_sql(f"DROP INDEX {index}")
+        table.create(connection)
+        columns = ", ".join(column.name for column in table.columns)
+        connection.exec_driver_sql(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {legacy}")
+        connection.exec_driver_sql(f"DROP TABLE {legacy}")
+
+def reserve_ids(connection, table_name: str, floor: int):
+    # Make an AUTOINCREMENT table hand out ids above floor (ids that live on outside the table)
+    connection.exec_driver_sql("UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?",
+                               (floor, table_name, floor))
+    connection.exec_driver_sql(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+        (table_name, floor, table_name))
+
+def compact_payloads(connection, chunk_size: int = 1000):
+    # Rows written before payloads became BLOBs still hold base64 text; convert them once.
+    # Values that are not canonical tokens come back unchanged and are left as text.
+    token = FernetToken()
+    last_id = 0
+    while True:
+        rows = connection.exec_driver_sql(
+            "SELECT id, encrypted_payload FROM vaultrecord "
+            "WHERE typeof(encrypted_payload) = 'text' AND id > ? ORDER BY id LIMIT ?",
+            (last_id, chunk_size),
+        ).all()
+        if not rows:
+            return
+        updates = []
+        for record_id, payload in rows:
+            raw = token.process_bind_param(payload, connection.dialect)
+            if isinstance(raw, bytes):
+                updates.append((raw, record_id))
+        if updates:
+            connection.exec_driver_sql("UPDATE vaultrecord SET encrypted_payload = ? WHERE id = ?", updates)
+        last_id = rows[-1][0]
+
+async def init_db(db_engine: AsyncEngine = engine):
+    async with db_engine.begin() as conn:
+        # Worker processes may start together: hold the write lock so exactly one creates the schema
+        if db_engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(ensure_columns)
+        if db_engine.dialect.name == "sqlite":
+            await conn.run_sync(ensure_autoincrement)
+        await conn.run_sync(ensure_indexes)
+        if db_engine.dialect.name == "sqlite":
+            await conn.run_sync(ensure_search_index)
+            await conn.run_sync(compact_payloads)
+
+async def get_session():
+    # expire_on_commit=False: async sessions cannot lazy-load expired attributes after commit
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,79 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from .security import get_password_hash, verify_password
+
+class HasherSaturated(Exception):
+    pass
+
+class PasswordHasherPool:
+    """Runs Argon2 hashing/verification on a bounded process pool.
+
+    At most ``max_pending`` jobs (queued plus running) are admitted; beyond that
+    calls fail fast with HasherSaturated. ``workers=0`` hashes inline on the
+    event loop, which is the pre-pool behavior and only useful as a baseline.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn: forking a process that already runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherSaturated()
+        self.pending += 1
+        try:
+            if self.workers <= 0:
+                result = fn(*args)
+            else:
+                self.start()
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        except Exception:
+            # e.g. a malformed stored hash or a broken pool; not work that completed
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+def pool_from_env() -> PasswordHasherPool:
+    workers = int(os.getenv("COGNIS_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    max_pending = int(os.getenv("COGNIS_HASH_QUEUE_DEPTH", str(max(workers, 1) * 8)))
+    return PasswordHasherPool(workers, max_pending)
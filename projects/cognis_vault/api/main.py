@@ -1,80 +1,466 @@
+import asyncio
+import hashlib
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response, status
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlmodel import Session, create_engine, select, SQLModel
-from typing import List
+from sqlmodel import select, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete, event, false, func, insert, update as bulk_update
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
-from .models import User, VaultRecord, AuditLog
-from .security import verify_password, get_password_hash, create_access_token, SECRET_KEY, ALGORITHM
+from .audit import sink_from_env
+from .audit_archive import AuditArchive, reserve_archived_ids, retention_loop
+from .db import engine, get_session, init_db, write_lock
+from .models import (User, VaultRecord, VaultRecordCreate, VaultRecordPayloadUpdate, PasswordChange,
+                     RecordTombstone, AuditLog)
+from .hashing import HasherSaturated, pool_from_env
+from .principal_cache import PrincipalCache
+from .search import search_statement
+from .security import create_access_token, SECRET_KEY, ALGORITHM
+from .wire import WIRE_COLUMNS, msgpack_response, negotiate, record_to_wire, rows_to_wire
 from jose import jwt, JWTError
+from ...common.metrics import MetricsMiddleware, MetricsRegistry, instrument_engine
 
-# Database Setup
-DATABASE_URL = "sqlite:///./cognis_vault.db"
-engine = create_engine(DATABASE_URL)
+# Keyset pagination limits for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Rows fetched per server-side cursor round trip during NDJSON export
+EXPORT_CHUNK_SIZE = 500
+# Responses at least this large are gzipped for clients that accept it; small ones are not worth the CPU
+GZIP_MIN_SIZE = int(os.getenv("COGNIS_GZIP_MIN_SIZE", "4096"))
+GZIP_LEVEL = int(os.getenv("COGNIS_GZIP_LEVEL", "5"))
+
+# Authenticated-principal cache: skips the per-request user lookup for known tokens. The hooks below
+# only invalidate this process's entries; the multi-worker launcher caps the TTL so others follow quickly
+principal_cache = PrincipalCache(
+    max_size=int(os.getenv("COGNIS_AUTH_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("COGNIS_AUTH_CACHE_TTL", "60")),
+)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
+
+# Audit events are queued and group-committed off the request path
+audit_sink = sink_from_env(engine)
+
+# Audit rows older than the hot window move to monthly compressed archive partitions
+AUDIT_HOT_DAYS = int(os.getenv("COGNIS_AUDIT_HOT_DAYS", "90"))
+AUDIT_RETENTION_INTERVAL = float(os.getenv("COGNIS_AUDIT_RETENTION_INTERVAL", "3600"))
+# Exactly one process may move audit rows; the launcher enables it on worker 0 only
+AUDIT_RETENTION_ENABLED = os.getenv("COGNIS_AUDIT_RETENTION", "1") == "1"
+audit_archive = AuditArchive(os.getenv("COGNIS_AUDIT_ARCHIVE_DIR", "./audit_archive"))
+
+# Argon2 runs on a bounded process pool so logins never block the event loop
+password_hasher = pool_from_env()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    await init_db()
+    await reserve_archived_ids(engine, audit_archive)
+    password_hasher.start()
+    audit_sink.start()
+    tasks = []
+    if AUDIT_RETENTION_ENABLED:
+        tasks.append(asyncio.create_task(
+            retention_loop(engine, audit_archive, AUDIT_HOT_DAYS, AUDIT_RETENTION_INTERVAL)
+        ))
     yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await audit_sink.stop()
+    password_hasher.shutdown()
+    await engine.dispose()
 
 app = FastAPI(title="Cognis Vault Pro API", version="1.0.0", lifespan=lifespan)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# Prometheus metrics on /metrics: per-route latency, SQL statement/connection timing, Argon2 timing
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+instrument_engine(engine, metrics)
+hash_duration = metrics.histogram(
+    "password_hash_duration_seconds", "Argon2 hash/verify time, including pool queueing", ("operation",))
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+async def run_hasher(operation, *args):
+    started = time.perf_counter()
+    try:
+        result = await operation(*args)
+    except HasherSaturated:
+        raise HTTPException(status_code=503, detail="Authentication service busy", headers={"Retry-After": "1"})
+    # Rejections are not timed; they show up as 503s in http_requests_total
+    hash_duration.observe(time.perf_counter() - started, operation.__name__)
+    return result
 
 # Auth Endpoints
 @app.post("/register")
-async def register(user: User, session: Session = Depends(get_session)):
-    user.hashed_password = get_password_hash(user.hashed_password)
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+async def register(user: User, session: AsyncSession = Depends(get_session)):
+    user.hashed_password = await run_hasher(password_hasher.hash, user.hashed_password)
+    async with write_lock():
+        session.add(user)
+        await session.commit()
+    await session.refresh(user)
+    # Account creation is compliance-critical: wait until the audit row is committed
+    await audit_sink.emit(user.id, f"REGISTER_USER: {user.username}", durable=True)
     return {"status": "success", "username": user.username}
 
 @app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_session)):
     statement = select(User).where(User.username == form_data.username)
-    user = session.exec(statement).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = (await session.exec(statement)).first()
+    if not user or not await run_hasher(password_hasher.verify, form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
     access_token = create_access_token(data={"sub": user.username, "id": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None: raise HTTPException(status_code=401)
     except JWTError: raise HTTPException(status_code=401)
-    
-    user = session.exec(select(User).where(User.username == username)).first()
-    if user is None: raise HTTPException(status_code=401)
+
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
+    user_id = payload.get("id")
+    if user_id is not None:
+        user = await session.get(User, user_id)
+    else:
+        user = (await session.exec(select(User).where(User.username == username))).first()
+    if user is None or user.username != username or not user.is_active:
+        raise HTTPException(status_code=401)
+
+    # Detach so the cached instance is not bound to (or expired by) this request's session
+    session.expunge(user)
+    principal_cache.put(token, user.id, user, token_exp=payload.get("exp"))
     return user
 
+@app.post("/users/me/password")
+async def change_password(change: PasswordChange, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    user = await session.get(User, current_user.id)
+    if not await run_hasher(password_hasher.verify, change.current_password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect password")
+    hashed = await run_hasher(password_hasher.hash, change.new_password)
+    async with write_lock():
+        user.hashed_password = hashed
+        # The flush fires the User after_update hook, which drops this process's cached principals
+        await session.commit()
+    await audit_sink.emit(user.id, f"CHANGE_PASSWORD: {user.username}", durable=True)
+    access_token = create_access_token(data={"sub": user.username, "id": user.id})
+    return {"status": "success", "access_token": access_token, "token_type": "bearer"}
+
+@app.get("/health")
+async def health(session: AsyncSession = Depends(get_session)):
+    # Readiness probe: uvicorn only serves once startup finished; the query proves the database answers
+    try:
+        await session.exec(select(1))
+    except Exception:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/stats")
+async def get_stats(current_user: User = Depends(get_current_user)):
+    # Internal cache/pool/queue counters: signed-in users only, like the /records and /audit routes
+    return {
+        "auth_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "audit": audit_sink.stats(),
+        "audit_archive": audit_archive.stats(),
+    }
+
+async def claim_writer(session: AsyncSession):
+    # Starts the SQLite write transaction before any timestamp is taken (a no-op DELETE
+    # acquires the database write lock), so updated_at/deleted_at follow commit order
+    # across API worker processes as well as within this one
+    await session.execute(delete(RecordTombstone).where(false()))
+
 # Vault Endpoints
 @app.post("/records", response_model=VaultRecord)
-async def create_record(record: VaultRecord, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+async def create_record(record: VaultRecord, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
     record.owner_id = current_user.id
-    session.add(record)
-    
-    # Audit logging
-    log = AuditLog(user_id=current_user.id, action=f"CREATE_RECORD: {record.title}")
-    session.add(log)
-    
-    session.commit()
-    session.refresh(record)
+
+    async with write_lock():
+        # Stamped once the write lock is held so updated_at follows commit order (the change feed relies on it)
+        await claim_writer(session)
+        record.updated_at = datetime.utcnow()
+        session.add(record)
+        await session.commit()
+    await session.refresh(record)
+
+    # Audit logging (write-behind, emitted only once the record is committed)
+    await audit_sink.emit(current_user.id, f"CREATE_RECORD: {record.title}")
     return record
 
+@app.post("/records/batch")
+async def create_records_batch(records: List[VaultRecordCreate], current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} records")
+    if not records:
+        return {"status": "success", "ids": []}
+
+    # Single transaction: executemany INSERT ... RETURNING; audit rows follow through the sink
+    rows = [dict(r.model_dump(), owner_id=current_user.id) for r in records]
+    async with write_lock():
+        await claim_writer(session)
+        now = datetime.utcnow()
+        for row in rows:
+            row["created_at"] = row["updated_at"] = now
+        ids = (await session.scalars(
+            insert(VaultRecord).returning(VaultRecord.id, sort_by_parameter_order=True), rows
+        )).all()
+        await session.commit()
+    await audit_sink.emit_many(current_user.id, (f"CREATE_RECORD: {r.title}" for r in records))
+    return {"status": "success", "ids": ids}
+
+@app.put("/records/batch")
+async def update_records_batch(updates: List[VaultRecordPayloadUpdate], current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    if len(updates) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} records")
+    requested = {u.id: u for u in updates}
+    if not requested:
+        return {"status": "success", "updated": [], "conflicts": []}
+
+    # Versions are read inside the write transaction, so check and update cannot interleave with
+    # another writer. Stale versions and missing records come back as conflicts, not errors.
+    async with write_lock():
+        await claim_writer(session)
+        current = (await session.exec(
+            select(VaultRecord.id, VaultRecord.version, VaultRecord.title)
+            .where(VaultRecord.owner_id == current_user.id, VaultRecord.id.in_(requested))
+        )).all()
+        now = datetime.utcnow()
+        matched = [(record_id, version, title) for record_id, version, title in current
+                   if requested[record_id].version == version]
+        if matched:
+            await session.execute(bulk_update(VaultRecord), [
+                {"id": record_id, "version": version + 1, "updated_at": now,
+                 "encrypted_payload": requested[record_id].encrypted_payload,
+                 "payload_encoding": requested[record_id].payload_encoding}
+                for record_id, version, _ in matched
+            ])
+        await session.commit()
+    updated = {record_id for record_id, _, _ in matched}
+    if matched:
+        await audit_sink.emit_many(current_user.id, (f"UPDATE_RECORD: {title}" for _, _, title in matched))
+    return {
+        "status": "success",
+        "updated": [i for i in requested if i in updated],
+        "conflicts": [i for i in requested if i not in updated],
+    }
+
+@app.get("/records/export")
+async def export_records(current_user: User = Depends(get_current_user)):
+    owner_id = current_user.id
+
+    # The body is produced after the request's dependencies exit, so the stream owns its session.
+    # Rows come off a server-side cursor in fixed-size chunks; memory does not grow with vault size.
+    async def ndjson():
+        async with AsyncSession(engine) as session:
+            statement = select(VaultRecord).where(VaultRecord.owner_id == owner_id).order_by(VaultRecord.id)
+            result = await session.stream(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            async for chunk in result.scalars().partitions():
+                yield "".join(record.model_dump_json() + "\n" for record in chunk)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/records/search", response_model=List[VaultRecord])
+async def search_records(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    # FTS5 prefix match over title/service_type, owner-scoped inside the index, best matches first
+    statement = search_statement(current_user.id, q, limit)
+    if statement is None:
+        return []
+    return (await session.scalars(statement)).all()
+
+def encode_change_cursor(timestamp: datetime, item_id: int) -> str:
+    return f"{timestamp.isoformat()}|{item_id}"
+
+def decode_change_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, item_id = cursor.split("|")
+        return datetime.fromisoformat(timestamp), int(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid since cursor")
+
+async def records_etag(session: AsyncSession, owner_id: int) -> str:
+    # Changes to a vault always raise max(updated_at) or max(deleted_at); both are index-only lookups
+    last_update, last_id = (await session.exec(
+        select(func.max(VaultRecord.updated_at), func.max(VaultRecord.id)).where(VaultRecord.owner_id == owner_id)
+    )).one()
+    last_delete = (await session.exec(
+        select(func.max(RecordTombstone.deleted_at)).where(RecordTombstone.owner_id == owner_id)
+    )).one()
+    digest = hashlib.sha256(f"{owner_id}|{last_update}|{last_id}|{last_delete}".encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+@app.get("/records/changes")
+async def get_record_changes(
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    compact: bool = Depends(negotiate),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    # The ETag is read before the page: if a write lands in between, the page is newer than
+    # the tag and the next sync simply repeats; the reverse order could hide that write
+    etag = await records_etag(session, current_user.id)
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept"})
+    response.headers["ETag"] = etag
+
+    # Upserts and deletions share one (timestamp, id) keyset; pass the returned cursor as since
+    cursor = decode_change_cursor(since) if since else None
+    statement = select(VaultRecord).where(VaultRecord.owner_id == current_user.id)
+    if cursor is not None:
+        statement = statement.where(tuple_(VaultRecord.updated_at, VaultRecord.id) > tuple_(*cursor))
+    statement = statement.order_by(VaultRecord.updated_at, VaultRecord.id).limit(limit + 1)
+    changes = [(r.updated_at, r.id, r) for r in (await session.exec(statement)).all()]
+
+    # A client without a cursor holds nothing yet, so earlier deletions are irrelevant to it
+    if cursor is not None:
+        statement = select(RecordTombstone).where(
+            RecordTombstone.owner_id == current_user.id,
+            tuple_(RecordTombstone.deleted_at, RecordTombstone.record_id) > tuple_(*cursor),
+        ).order_by(RecordTombstone.deleted_at, RecordTombstone.record_id).limit(limit + 1)
+        changes += [(t.deleted_at, t.record_id, None) for t in (await session.exec(statement)).all()]
+
+    changes.sort(key=lambda change: change[:2])
+    page = changes[:limit]
+    # Only the latest change per id is reported, so a page can be applied in any order
+    latest = {item_id: record for _, item_id, record in page}
+    body = {
+        "records": [record for record in latest.values() if record is not None],
+        "deleted": [item_id for item_id, record in latest.items() if record is None],
+        "cursor": encode_change_cursor(*page[-1][:2]) if page else since,
+        "has_more": len(changes) > limit,
+    }
+    if compact:
+        body["records"] = [record_to_wire(record) for record in body["records"]]
+        return msgpack_response(body, headers={"ETag": etag})
+    return body
+
+async def get_owned_record(session: AsyncSession, record_id: int, owner_id: int) -> VaultRecord:
+    record = await session.get(VaultRecord, record_id)
+    if record is None or record.owner_id != owner_id:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return record
+
+@app.put("/records/{record_id:int}", response_model=VaultRecord)
+async def update_record(record_id: int, update: VaultRecordCreate, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    record = await get_owned_record(session, record_id, current_user.id)
+    async with write_lock():
+        await claim_writer(session)
+        record.sqlmodel_update(update.model_dump())
+        record.version += 1
+        record.updated_at = datetime.utcnow()
+        await session.commit()
+    await audit_sink.emit(current_user.id, f"UPDATE_RECORD: {record.title}")
+    return record
+
+@app.delete("/records/{record_id:int}")
+async def delete_record(record_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    record = await get_owned_record(session, record_id, current_user.id)
+    title = record.title
+    async with write_lock():
+        await claim_writer(session)
+        await session.delete(record)
+        session.add(RecordTombstone(record_id=record_id, owner_id=current_user.id, deleted_at=datetime.utcnow()))
+        await session.commit()
+    await audit_sink.emit(current_user.id, f"DELETE_RECORD: {title}")
+    return {"status": "success", "id": record_id}
+
+@app.get("/records/{record_id:int}", response_model=VaultRecord)
+async def get_record(record_id: int, current_user: User = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    return await get_owned_record(session, record_id, current_user.id)
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC, so aware query params are normalized first
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 @app.get("/records", response_model=List[VaultRecord])
-async def list_records(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    return session.exec(select(VaultRecord).where(VaultRecord.owner_id == current_user.id)).all()
+async def list_records(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    compact: bool = Depends(negotiate),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    # Keyset pagination over (owner_id, id): pass the last id of a page as after_id
+    statement = select(*WIRE_COLUMNS) if compact else select(VaultRecord)
+    statement = statement.where(VaultRecord.owner_id == current_user.id)
+    if after_id is not None:
+        statement = statement.where(VaultRecord.id > after_id)
+    statement = statement.order_by(VaultRecord.id).limit(limit)
+    if compact:
+        return msgpack_response(rows_to_wire((await session.execute(statement)).all()))
+    return (await session.exec(statement)).all()
 
 @app.get("/audit", response_model=List[AuditLog])
-async def get_audit_logs(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
-    return session.exec(select(AuditLog).where(AuditLog.user_id == current_user.id)).all()
+async def get_audit_logs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    # Read-your-writes: commit anything still queued in this process's write-behind sink first.
+    # Other workers' non-durable events appear once their sink flushes (COGNIS_AUDIT_FLUSH_MS);
+    # rows are stamped at commit, so a later commit never sorts behind a cursor already handed out
+    await audit_sink.flush()
+    since, until = to_utc_naive(since), to_utc_naive(until)
+
+    # Keyset pagination over (timestamp, id); since is inclusive, until exclusive
+    cursor = None
+    if after_id is not None:
+        row = await session.get(AuditLog, after_id)
+        if (row is None or row.user_id != current_user.id) and include_archived:
+            row = await asyncio.to_thread(audit_archive.find, current_user.id, after_id)
+        if row is None or row.user_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Invalid after_id cursor")
+        cursor = (row.timestamp, row.id)
+
+    # Archived partitions hold strictly older rows, so they are read first and only
+    # those overlapping [since, until) are opened; the hot table fills the rest of the page
+    results: List[AuditLog] = []
+    if include_archived:
+        results = await asyncio.to_thread(audit_archive.query, current_user.id, since, until, cursor, limit)
+        if results:
+            cursor = (results[-1].timestamp, results[-1].id)
+    if len(results) >= limit:
+        return results
+
+    statement = select(AuditLog).where(AuditLog.user_id == current_user.id)
+    if since is not None:
+        statement = statement.where(AuditLog.timestamp >= since)
+    if until is not None:
+        statement = statement.where(AuditLog.timestamp < until)
+    if cursor is not None:
+        statement = statement.where(tuple_(AuditLog.timestamp, AuditLog.id) > tuple_(*cursor))
+    statement = statement.order_by(AuditLog.timestamp, AuditLog.id).limit(limit - len(results))
+    return results + list((await session.exec(statement)).all())
 
 if __name__ == "__main__":
     import uvicorn
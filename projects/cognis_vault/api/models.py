@@ -1,6 +1,30 @@
-from typing import Optional, List
+import base64
+import binascii
+from typing import Optional
 from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import LargeBinary, TypeDecorator
+from sqlmodel import SQLModel, Field, Index
+
+class FernetToken(TypeDecorator):
+    """Fernet tokens are base64 text in Python and JSON, but stored as their raw bytes (BLOB),
+    a quarter smaller. Rows written before the switch (or non-token text) stay TEXT and read back as-is."""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(value)
+        except (binascii.Error, ValueError):
+            return value
+        # Only canonical tokens round-trip exactly; anything else is kept verbatim
+        return raw if base64.urlsafe_b64encode(raw).decode() == value else value
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return base64.urlsafe_b64encode(value).decode()
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -10,15 +34,60 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class VaultRecord(SQLModel, table=True):
+    # Composite indexes back keyset pagination (owner_id, id) and the change feed (owner_id, updated_at)
+    __table_args__ = (
+        Index("ix_vaultrecord_owner_id_id", "owner_id", "id"),
+        Index("ix_vaultrecord_owner_id_updated_at", "owner_id", "updated_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(index=True)
     service_type: str  # e.g., 'Password', 'Secret', 'SSH'
-    encrypted_payload: str
+    encrypted_payload: str = Field(sa_type=FernetToken)
+    # How the plaintext was encoded before encryption: "" (UTF-8) or "zlib"; opaque to the server
+    payload_encoding: str = Field(default="", sa_column_kwargs={"server_default": ""})
+    # Bumped on every write; batch updates apply only while the client's version still matches
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     owner_id: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class VaultRecordCreate(SQLModel):
+    # Validated input for bulk ingestion; owner and timestamps are set server-side
+    title: str = Field(min_length=1)
+    service_type: str
+    encrypted_payload: str
+    payload_encoding: str = ""
+
+class VaultRecordPayloadUpdate(SQLModel):
+    # One item of PUT /records/batch (e.g. key rotation): replaces the ciphertext if version matches
+    id: int
+    version: int
+    encrypted_payload: str
+    payload_encoding: str = ""
+
+class PasswordChange(SQLModel):
+    current_password: str
+    new_password: str = Field(min_length=1)
+
+class RecordTombstone(SQLModel, table=True):
+    # Deleted record ids, reported by the change feed so client caches can drop them
+    __table_args__ = (Index("ix_recordtombstone_owner_id_deleted_at", "owner_id", "deleted_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    record_id: int
+    owner_id: int = Field(foreign_key="user.id")
+    deleted_at: datetime = Field(default_factory=datetime.utcnow)
+
 class AuditLog(SQLModel, table=True):
+    # Composite index backs time-range filters and (timestamp, id) keyset pagination.
+    # AUTOINCREMENT: retention can empty the table, and plain rowids would then be reused
+    # and collide with ids already in the archive (which /audit cursors resolve against)
+    __table_args__ = (
+        Index("ix_auditlog_user_id_timestamp", "user_id", "timestamp"),
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     action: str
@@ -0,0 +1,65 @@
+import re
+from typing import Optional
+from sqlalchemy import text
+from sqlmodel import select
+from .models import VaultRecord
+
+# External-content FTS5 index over vaultrecord: the text lives only in vaultrecord, the
+# index holds tokens. owner_id is indexed as a token so "owner_id:<id>" scopes a query
+# inside the index instead of filtering other users' hits afterwards. prefix='2 3' keeps
+# short type-ahead prefixes off the slow full-vocabulary scan.
+FTS_TABLE = "vaultrecord_fts"
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, service_type, owner_id,
+        content='vaultrecord', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    # Triggers keep the index in step with every write path (ORM, bulk insert, retention, raw SQL)
+    f"""CREATE TRIGGER IF NOT EXISTS vaultrecord_fts_insert AFTER INSERT ON vaultrecord BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, service_type, owner_id)
+        VALUES (new.id, new.title, new.service_type, new.owner_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS vaultrecord_fts_delete AFTER DELETE ON vaultrecord BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, service_type, owner_id)
+        VALUES ('delete', old.id, old.title, old.service_type, old.owner_id);
+    END""",
+    # Payload-only updates (e.g. re-encryption) leave the index untouched
+    f"""CREATE TRIGGER IF NOT EXISTS vaultrecord_fts_update AFTER UPDATE OF title, service_type, owner_id ON vaultrecord BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, service_type, owner_id)
+        VALUES ('delete', old.id, old.title, old.service_type, old.owner_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, service_type, owner_id)
+        VALUES (new.id, new.title, new.service_type, new.owner_id);
+    END""",
+]
+# bm25 column weights: a title hit outranks a type hit; the owner token never scores
+RANK = f"bm25({FTS_TABLE}, 10.0, 4.0, 0.0)"
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def ensure_search_index(connection):
+    # Runs inside init_db's transaction; an index created over existing rows is backfilled once
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def match_expression(owner_id: int, query: str) -> Optional[str]:
+    # Every word becomes a quoted prefix term, so user input can never inject FTS5 syntax
+    terms = [f'"{token}"*' for token in TOKEN.findall(query)]
+    if not terms:
+        return None
+    return f"owner_id:{int(owner_id)} AND {{title service_type}}: ({' '.join(terms)})"
+
+def search_statement(owner_id: int, query: str, limit: int):
+    match = match_expression(owner_id, query)
+    if match is None:
+        return None
+    sql = text(
+        f"SELECT vaultrecord.* FROM {FTS_TABLE} JOIN vaultrecord ON vaultrecord.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match AND vaultrecord.owner_id = :owner_id "
+        f"ORDER BY {RANK}, vaultrecord.id LIMIT :limit"
+    ).bindparams(match=match, owner_id=owner_id, limit=limit)
+    return select(VaultRecord).from_statement(sql)
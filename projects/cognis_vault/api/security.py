@@ -1,6 +1,7 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import jwt
 from passlib.context import CryptContext
 
 # SECRET_KEY should be handled via env in real prod, but for this "delivered" software we use a robust default
@@ -8,8 +9,19 @@ SECRET_KEY = "COGNIS_VAULT_ULTRA_SECRET_KEY_PRO_ONLY_2026"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Argon2 cost parameters (passlib defaults); existing hashes keep verifying after a change
+ARGON2_TIME_COST = int(os.getenv("COGNIS_ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("COGNIS_ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("COGNIS_ARGON2_PARALLELISM", "4"))
+
 # Using Argon2 via Passlib for real-world security
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Optional, Sequence
+from fastapi import Request, Response
+from sqlalchemy import type_coerce
+from sqlalchemy.types import NullType
+from .models import FernetToken, VaultRecord
+
+# msgpack is optional: without it every client is served JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_token = FernetToken()
+
+def wants_msgpack(request: Request) -> bool:
+    # Clients opt in through Accept; browsers and older SDKs keep getting JSON
+    return msgpack is not None and MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+def negotiate(request: Request, response: Response) -> bool:
+    # Dependency for endpoints that serve JSON or msgpack from one URL: every variant (JSON, msgpack,
+    # 304) says it depends on Accept, so shared caches never hand one format to the other kind of client
+    response.headers["Vary"] = "Accept"
+    return wants_msgpack(request)
+
+def record_to_wire(record: VaultRecord) -> dict:
+    # Same keys as the JSON body, but the Fernet token travels as raw bytes (bin) instead of base64
+    return {
+        "id": record.id,
+        "title": record.title,
+        "service_type": record.service_type,
+        "encrypted_payload": _token.process_bind_param(record.encrypted_payload, None),
+        "payload_encoding": record.payload_encoding,
+        "version": record.version,
+        "owner_id": record.owner_id,
+        "created_at": record.created_at.isoformat(),
+        "updated_at": record.updated_at.isoformat(),
+    }
+
+# Driver values without result processing: BLOB payloads stay raw bytes (no base64 round trip)
+# and SQLite timestamps stay strings, so bulk pages are encoded without building ORM objects
+_RAW = NullType()
+WIRE_COLUMNS = (
+    VaultRecord.id,
+    VaultRecord.title,
+    VaultRecord.service_type,
+    type_coerce(VaultRecord.encrypted_payload, _RAW).label("encrypted_payload"),
+    VaultRecord.payload_encoding,
+    VaultRecord.version,
+    VaultRecord.owner_id,
+    type_coerce(VaultRecord.created_at, _RAW).label("created_at"),
+    type_coerce(VaultRecord.updated_at, _RAW).label("updated_at"),
+)
+
+def _isoformat(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else value.replace(" ", "T", 1)
+
+def rows_to_wire(rows: Sequence) -> list:
+    # rows selected with WIRE_COLUMNS; legacy text payloads pass through as str
+    return [
+        {
+            "id": record_id,
+            "title": title,
+            "service_type": service_type,
+            "encrypted_payload": bytes(payload) if isinstance(payload, memoryview) else payload,
+            "payload_encoding": payload_encoding,
+            "version": version,
+            "owner_id": owner_id,
+            "created_at": _isoformat(created_at),
+            "updated_at": _isoformat(updated_at),
+        }
+        for record_id, title, service_type, payload, payload_encoding, version, owner_id, created_at, updated_at in rows
+    ]
+
+def msgpack_response(content, headers: Optional[dict] = None) -> Response:
+    headers = dict(headers or {}, Vary="Accept")
+    return Response(msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
@@ -2,29 +2,50 @@ import sys
 import os
 import threading
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLineEdit, QPushButton, QLabel, QTableWidget, QTableWidgetItem,
+                             QLineEdit, QPushButton, QLabel, QTableView,
                              QTabWidget, QMessageBox, QDialog, QFormLayout)
 from PySide6.QtCore import Qt, Signal, Slot
 
 # Robust import logic
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_dir = os.path.abspath(os.path.join(current_dir, ".."))
-if project_dir not in sys.path:
-    sys.path.insert(0, project_dir)
+workspace_dir = os.path.abspath(os.path.join(project_dir, "..", ".."))
+for path in (workspace_dir, project_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from sdk.cognis_sdk import CognisSDK
 from gui.styles import STYLESHEET
+from gui.record_model import PAGE_SIZE, PagedTableModel, RecordFilterProxy, RecordTableModel, pages_of
+from projects.common.qt_tasks import TaskProgress, TaskRunner
+
+# Server search hits merged per query; the local filter still covers every loaded row
+SEARCH_LIMIT = 100
+
+# Encrypted local record cache: refreshes only download what changed
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cognis_vault", "cache")
 
 class CognitoApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.sdk = CognisSDK()
+        self.sdk = CognisSDK(cache_dir=CACHE_DIR)
         self.setWindowTitle("Cognis Vault Professional v1.0")
         self.resize(1000, 700)
         self.setStyleSheet(STYLESHEET)
-        
+
+        # Network calls and key derivation run on a worker pool; the status bar shows progress and Cancel
+        self.tasks = TaskRunner(self)
+        self.statusBar().addPermanentWidget(TaskProgress(self.tasks))
+
         self.init_login()
 
+    def closeEvent(self, event):
+        self.tasks.shutdown()
+        super().closeEvent(event)
+
+    def show_error(self, error: BaseException):
+        QMessageBox.warning(self, "Error", str(error))
+
     def init_login(self):
         self.central = QWidget()
         self.setCentralWidget(self.central)
@@ -59,7 +80,11 @@ class CognitoApp(QMainWindow):
 
     def handle_login(self):
         u, p = self.user_input.text(), self.pass_input.text()
-        if self.sdk.login(u, p):
+        # Repeated clicks while a login is in flight collapse into one follow-up attempt
+        self.tasks.submit(self.sdk.login, u, p, key="login", on_done=self.on_login, on_error=self.show_error)
+
+    def on_login(self, ok: bool):
+        if ok:
             self.init_dashboard()
         else:
             QMessageBox.critical(self, "Error", "Authentication Failed")
@@ -67,8 +92,8 @@ class CognitoApp(QMainWindow):
     def handle_register(self):
         u, p = self.user_input.text(), self.pass_input.text()
         if not u or not p: return
-        res = self.sdk.register(u, p)
-        QMessageBox.information(self, "Success", f"User {u} registered. Please login.")
+        self.tasks.submit(self.sdk.register, u, p, key="register", on_error=self.show_error,
+                          on_done=lambda res: QMessageBox.information(self, "Success", f"User {u} registered. Please login."))
 
     def init_dashboard(self):
         self.tabs = QTabWidget()
@@ -77,9 +102,22 @@ class CognitoApp(QMainWindow):
         # Tab 1: Secrets
         self.vault_tab = QWidget()
         v_layout = QVBoxLayout(self.vault_tab)
-        
-        self.record_table = QTableWidget(0, 4)
-        self.record_table.setHorizontalHeaderLabels(["Title", "Type", "Payload", "Created At"])
+
+        # Instant filter over the loaded records; the server's full-text search covers the rest
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search title or type...")
+        self.search_input.textChanged.connect(self.apply_filter)
+        v_layout.addWidget(self.search_input)
+
+        # Model/view: rows arrive page by page as the view scrolls; payloads decrypt only when painted
+        self.record_model = RecordTableModel(self)
+        self.records_loaded = False
+        self.record_proxy = RecordFilterProxy(self)
+        self.record_proxy.setSourceModel(self.record_model)
+        self.record_table = QTableView()
+        self.record_table.setModel(self.record_proxy)
+        self.record_table.setSortingEnabled(True)
+        self.record_table.sortByColumn(-1, Qt.AscendingOrder)
         self.record_table.horizontalHeader().setStretchLastSection(True)
         v_layout.addWidget(self.record_table)
 
@@ -97,8 +135,10 @@ class CognitoApp(QMainWindow):
         # Tab 2: Audit Logs
         self.audit_tab = QWidget()
         a_layout = QVBoxLayout(self.audit_tab)
-        self.audit_table = QTableWidget(0, 2)
-        self.audit_table.setHorizontalHeaderLabels(["Action", "Timestamp"])
+        self.audit_model = PagedTableModel((("Action", "action"), ("Timestamp", "timestamp")), self, runner=self.tasks)
+        self.audit_model.load_failed.connect(self.show_error)
+        self.audit_table = QTableView()
+        self.audit_table.setModel(self.audit_model)
         self.audit_table.horizontalHeader().setStretchLastSection(True)
         a_layout.addWidget(self.audit_table)
         self.tabs.addTab(self.audit_tab, "Security Audit")
@@ -106,21 +146,37 @@ class CognitoApp(QMainWindow):
         self.load_data()
 
     def load_data(self):
-        # Load Records
-        records = self.sdk.list_secrets()
-        self.record_table.setRowCount(len(records))
-        for i, r in enumerate(records):
-            self.record_table.setItem(i, 0, QTableWidgetItem(r['title']))
-            self.record_table.setItem(i, 1, QTableWidgetItem(r['service_type']))
-            self.record_table.setItem(i, 2, QTableWidgetItem(r['payload']))
-            self.record_table.setItem(i, 3, QTableWidgetItem(r['created_at']))
-
-        # Load Audits
-        logs = self.sdk.get_audit_logs()
-        self.audit_table.setRowCount(len(logs))
-        for i, l in enumerate(logs):
-            self.audit_table.setItem(i, 0, QTableWidgetItem(l['action']))
-            self.audit_table.setItem(i, 1, QTableWidgetItem(l['timestamp']))
+        self.load_records()
+        # Audit pages are requested from the server only as the view scrolls down
+        self.audit_model.reset(self.sdk.iter_audit_pages(page_size=PAGE_SIZE))
+
+    def load_records(self):
+        # Refreshes while a sync is running are coalesced into one follow-up sync
+        self.tasks.submit(self.fetch_records, key="records", with_task=True,
+                          on_done=self.show_records, on_error=self.show_error)
+
+    def fetch_records(self, task):
+        # Worker thread: list_secrets syncs the local cache and returns lazy records (still encrypted)
+        return self.sdk.list_secrets(progress=task.report)
+
+    def show_records(self, records):
+        self.records_loaded = True
+        self.record_model.reset(pages_of(records))
+        self.apply_filter(self.search_input.text())
+
+    def apply_filter(self, text: str):
+        self.record_proxy.set_filter_text(text)
+        # Rows not loaded yet (more pages, or the first sync still running) are searched on the server;
+        # hits are merged into the model, where the same filter shows them
+        if text.strip() and (self.record_model.canFetchMore() or not self.records_loaded):
+            self.tasks.submit(self.sdk.search_secrets, text, SEARCH_LIMIT, key="search",
+                              on_done=lambda records: self.show_search_results(text, records),
+                              on_error=self.show_error)
+
+    def show_search_results(self, text: str, records):
+        # A slower search for an older query must not add rows for text no longer in the box
+        if text == self.search_input.text():
+            self.record_model.merge(records)
 
     def show_add_dialog(self):
         dialog = QDialog(self)
@@ -136,12 +192,13 @@ class CognitoApp(QMainWindow):
         form.addRow("Type:", type_in)
         form.addRow("Content:", content_in)
         
+        def save():
+            self.tasks.submit(self.sdk.add_secret, title_in.text(), type_in.text(), content_in.text(),
+                              on_done=lambda _: self.load_data(), on_error=self.show_error)
+            dialog.accept()
+
         save_btn = QPushButton("SAVE SECURELY")
-        save_btn.clicked.connect(lambda: [
-            self.sdk.add_secret(title_in.text(), type_in.text(), content_in.text()),
-            dialog.accept(),
-            self.load_data()
-        ])
+        save_btn.clicked.connect(save)
         form.addRow(save_btn)
         dialog.exec()
 
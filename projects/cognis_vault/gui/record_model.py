@@ -0,0 +1,176 @@
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, Signal
+
+# Rows handed to the view per fetchMore() call
+PAGE_SIZE = 500
+# Role used for sorting; it never decrypts, so sorting cannot touch every payload
+SORT_ROLE = Qt.UserRole + 1
+
+def pages_of(rows: Sequence[dict], size: int = PAGE_SIZE) -> Iterator[List[dict]]:
+    for start in range(0, len(rows), size):
+        yield list(rows[start:start + size])
+
+class PagedTableModel(QAbstractTableModel):
+    """Table model fed page by page from an iterator of row lists.
+
+    The view pulls the next page through canFetchMore/fetchMore as it scrolls,
+    and asks data() only for the cells it paints, so no per-cell items exist.
+    With a TaskRunner, each next page is fetched on the worker pool (for
+    iterators that do network I/O) and appended when it arrives. A page that
+    fails ends the list and is reported through load_failed, so a partial
+    list is never shown as complete without notice.
+    """
+
+    load_failed = Signal(object)
+
+    def __init__(self, columns: Sequence[Tuple[str, str]], parent=None, runner=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._rows: List[dict] = []
+        self._pages: Optional[Iterator[List[dict]]] = None
+        self._runner = runner
+        self._loading = False
+        # Pages requested before the last reset() are dropped when they arrive
+        self._generation = 0
+
+    def reset(self, pages: Iterable[List[dict]]):
+        self.beginResetModel()
+        self._rows = []
+        self._pages = iter(pages)
+        self._loading = False
+        self._generation += 1
+        self.endResetModel()
+        # A view that is already on screen does not always ask again after a reset, so load the first page now
+        self.fetchMore()
+
+    def row(self, index: int) -> dict:
+        return self._rows[index]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self._columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        key = self._columns[index.column()][1]
+        if role == Qt.DisplayRole:
+            return self.display(row, key)
+        if role == SORT_ROLE:
+            return self.sort_key(row, key)
+        return None
+
+    def display(self, row: dict, key: str) -> str:
+        value = row.get(key)
+        return "" if value is None else str(value)
+
+    def sort_key(self, row: dict, key: str):
+        return self.display(row, key)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._pages is not None and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        if self._runner is None:
+            self._append(self._generation, next(self._pages, None))
+            return
+        # The view asks again once the rows have arrived and there is still room
+        self._loading = True
+        generation = self._generation
+        self._runner.submit(next, self._pages, None,
+                            on_done=lambda page: self._append(generation, page),
+                            on_error=lambda error: self._failed(generation, error),
+                            on_cancel=lambda page: self._cancelled(generation, page))
+
+    def _failed(self, generation: int, error: BaseException):
+        if generation != self._generation:
+            return
+        self._append(generation, None)
+        self.load_failed.emit(error)
+
+    def _cancelled(self, generation: int, page: Optional[List[dict]]):
+        # The iterator only advanced if next() had already returned; keep that page rather than skip it
+        if page:
+            self._append(generation, page)
+        elif generation == self._generation:
+            self._loading = False
+
+    def _append(self, generation: int, page: Optional[List[dict]]):
+        if generation != self._generation:
+            return
+        self._loading = False
+        if not page:
+            self._pages = None
+            return
+        self._insert(page)
+
+    def _insert(self, rows: List[dict]):
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+class RecordTableModel(PagedTableModel):
+    """Vault records; rows are lazy SecretRecords, so a payload is decrypted the first time its cell is painted"""
+
+    COLUMNS = (("Title", "title"), ("Type", "service_type"), ("Payload", "payload"), ("Created At", "created_at"))
+
+    def __init__(self, parent=None):
+        super().__init__(self.COLUMNS, parent)
+        self._ids = set()
+
+    def reset(self, pages: Iterable[List[dict]]):
+        self._ids = set()
+        super().reset(pages)
+
+    def merge(self, rows: Iterable[dict]):
+        """Add rows found outside the loaded pages (server search hits); rows already present are skipped"""
+        self._insert(self._new_rows(rows))
+
+    def _new_rows(self, rows: Iterable[dict]) -> List[dict]:
+        fresh = [row for row in rows if row.get("id") not in self._ids]
+        self._ids.update(row.get("id") for row in fresh)
+        return fresh
+
+    def _append(self, generation: int, page: Optional[List[dict]]):
+        # A page whose rows were all merged from a search earlier is not the end of the data
+        if generation == self._generation and page:
+            self._loading = False
+            self._insert(self._new_rows(page))
+            return
+        super()._append(generation, page)
+
+    def sort_key(self, row: dict, key: str):
+        # Sorting by payload would decrypt every loaded row; that column keeps load order instead
+        return "" if key == "payload" else super().sort_key(row, key)
+
+class RecordFilterProxy(QSortFilterProxyModel):
+    """Instant filter on title and type (case-insensitive substring) over the loaded rows; payloads are never decrypted to match"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self._needle = ""
+
+    def set_filter_text(self, text: str):
+        self._needle = text.strip().casefold()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._needle:
+            return True
+        record = self.sourceModel().row(source_row)
+        return (self._needle in record.get("title", "").casefold()
+                or self._needle in record.get("service_type", "").casefold())
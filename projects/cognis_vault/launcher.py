@@ -1,46 +1,213 @@
-import subprocess
-import time
-import sys
+"""
+Cognis Vault launcher: supervises the API workers, then runs the GUI.
+
+The supervisor binds the API socket once and shares it with N worker
+processes, so the kernel spreads connections across them. It polls
+/health until the first ready response and reports that as the cold-start
+time. A worker that crashes is restarted with backoff. On exit, every
+worker is asked to drain its in-flight requests before it is stopped.
+
+    python -m projects.cognis_vault.launcher --workers 2
+    python -m projects.cognis_vault.launcher --startup-check   # report cold start and exit
+"""
+import argparse
+import json
+import multiprocessing
 import os
 import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Robust path logic
+base_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(base_dir) # The 'projects' folder
+workspace_root = os.path.dirname(root_dir) # The root folder
+
+API_APP = "projects.cognis_vault.api.main:app"
+# A worker that dies sooner than this after starting counts as crash-looping
+CRASH_WINDOW = 10.0
+MAX_RESTART_DELAY = 30.0
+# Principal-cache invalidation only reaches the worker that changed the user; with several workers this
+# bounds how long the others keep accepting a deactivated or deleted user's token
+MULTI_WORKER_AUTH_CACHE_TTL = 5.0
+
+def serve_worker(index: int, workers: int, sockets, stop_event, drain_timeout: float):
+    """Worker process entry point (spawned): serves the shared socket until stop_event is set"""
+    if workspace_root not in sys.path:
+        sys.path.insert(0, workspace_root)
+    # Same working directory as the GUI, so relative database paths resolve identically
+    os.chdir(workspace_root)
+    # Audit retention must run in a single process; Argon2 pools share the CPUs between workers
+    os.environ["COGNIS_AUDIT_RETENTION"] = "1" if index == 0 else "0"
+    if workers > 1:
+        os.environ.setdefault("COGNIS_HASH_WORKERS", str(min(4, max(1, (os.cpu_count() or 1) // workers))))
+        ttl = float(os.environ.get("COGNIS_AUTH_CACHE_TTL", MULTI_WORKER_AUTH_CACHE_TTL))
+        os.environ["COGNIS_AUTH_CACHE_TTL"] = str(min(ttl, MULTI_WORKER_AUTH_CACHE_TTL))
+
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(API_APP, log_level="warning", timeout_graceful_shutdown=int(drain_timeout)))
+
+    # should_exit makes uvicorn stop accepting, finish in-flight requests and run the lifespan shutdown.
+    # A supervisor that was killed outright cannot signal, so its disappearance also triggers a drain.
+    supervisor = multiprocessing.parent_process()
+    def drain():
+        while not stop_event.wait(1.0):
+            if supervisor is not None and not supervisor.is_alive():
+                break
+        server.should_exit = True
+    threading.Thread(target=drain, daemon=True).start()
+    server.run(sockets=sockets)
+
+class ApiSupervisor:
+    def __init__(self, workers: int = 1, host: str = "127.0.0.1", port: int = 8888,
+                 ready_timeout: float = 30.0, drain_timeout: float = 10.0):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.ready_timeout = ready_timeout
+        self.drain_timeout = drain_timeout
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes = []
+        self._started_at = []
+        self._delays = []
+        self._sockets = None
+        self._stopping = threading.Event()
+        self._monitor = None
+
+    @property
+    def health_url(self) -> str:
+        return f"http://{self.host}:{self.port}/health"
+
+    def start(self) -> float:
+        """启动全部 worker 并等待就绪, 返回冷启动耗时 (秒)"""
+        import uvicorn
+        started = time.perf_counter()
+        self._sockets = [uvicorn.Config(API_APP, host=self.host, port=self.port).bind_socket()]
+        for index in range(self.workers):
+            self._processes.append(None)
+            self._started_at.append(0.0)
+            self._delays.append(0.0)
+            self._spawn(index)
+        self.wait_ready()
+        cold_start = time.perf_counter() - started
+        self._monitor = threading.Thread(target=self._watch, daemon=True)
+        self._monitor.start()
+        return cold_start
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=serve_worker,
+            args=(index, self.workers, self._sockets, self._stop_event, self.drain_timeout),
+            name=f"cognis-api-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+
+    def wait_ready(self):
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            if not any(p.is_alive() for p in self._processes):
+                raise RuntimeError("All API workers exited during startup")
+            try:
+                with urllib.request.urlopen(self.health_url, timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"API not ready after {self.ready_timeout:.0f}s")
+
+    def _watch(self):
+        while not self._stopping.wait(0.5):
+            for index, process in enumerate(self._processes):
+                # Exit code 0 is a deliberate shutdown (e.g. Ctrl+C reached the process group)
+                if process.is_alive() or process.exitcode == 0 or self._stopping.is_set():
+                    continue
+                # Back off exponentially while a worker keeps dying right after start
+                uptime = time.monotonic() - self._started_at[index]
+                delay = self._delays[index] = (
+                    min(MAX_RESTART_DELAY, max(0.5, self._delays[index] * 2)) if uptime < CRASH_WINDOW else 0.0
+                )
+                print(f"[WARN] API worker {index} exited with code {process.exitcode}; "
+                      f"restarting in {delay:.1f}s")
+                if self._stopping.wait(delay):
+                    return
+                self.restarts += 1
+                self._spawn(index)
+
+    def stop(self):
+        """优雅停机: 通知 worker 排空在途请求, 超时后强制结束"""
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join()
+        self._stop_event.set()
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self._processes:
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for sock in self._sockets or []:
+            sock.close()
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("COGNIS_API_WORKERS", "1")))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--ready-timeout", type=float, default=30.0, help="seconds to wait for /health")
+    parser.add_argument("--drain-timeout", type=float, default=10.0, help="seconds for in-flight requests on shutdown")
+    parser.add_argument("--startup-check", action="store_true", help="print cold-start time as JSON and exit")
+    parser.add_argument("--no-gui", action="store_true", help="run the API only, until Ctrl+C")
+    args = parser.parse_args()
+
     print("--- Cognis Vault Pro System Bootstrap ---")
-    
-    # Robust path logic
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(base_dir) # The 'projects' folder
-    workspace_root = os.path.dirname(root_dir) # The root folder
-    
-    py_path = sys.executable
-    
-    # 1. Start API Server in background
-    print("[1/2] Launching Backend Secure Service (Port 8888)...")
-    env = os.environ.copy()
-    env["PYTHONPATH"] = workspace_root
-    
-    api_process = subprocess.Popen(
-        [py_path, "-m", "projects.cognis_vault.api.main"],
-        cwd=workspace_root,
-        env=env
-    )
-    
-    time.sleep(3) # Wait for server to initialize DB
-    
-    # 2. Start GUI
-    print("[2/2] Launching Professional UI...")
+    # Workers and the GUI resolve 'projects.*' from the workspace root
+    os.environ["PYTHONPATH"] = workspace_root
+    if workspace_root not in sys.path:
+        sys.path.insert(0, workspace_root)
+
+    # 1. Start API workers and wait until they answer
+    print(f"[1/2] Launching Backend Secure Service (Port {args.port}, {args.workers} worker(s))...")
+    supervisor = ApiSupervisor(args.workers, args.host, args.port, args.ready_timeout, args.drain_timeout)
     try:
-        gui_process = subprocess.run(
-            [py_path, "-m", "projects.cognis_vault.gui.main_window"],
-            cwd=workspace_root,
-            env=env
-        )
+        cold_start = supervisor.start()
+    except (RuntimeError, TimeoutError) as e:
+        print(f"[FAIL] {e}")
+        supervisor.stop()
+        sys.exit(1)
+    print(f"[INFO] API ready in {cold_start:.2f}s")
+    # SIGTERM (service managers, kill) drains like Ctrl+C instead of orphaning the workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        if args.startup_check:
+            print(json.dumps({"workers": args.workers, "cold_start_s": round(cold_start, 3)}))
+        elif args.no_gui:
+            while True:
+                time.sleep(1)
+        else:
+            # 2. Start GUI
+            print("[2/2] Launching Professional UI...")
+            subprocess.run(
+                [sys.executable, "-m", "projects.cognis_vault.gui.main_window"],
+                cwd=workspace_root,
+                env=os.environ.copy()
+            )
     except KeyboardInterrupt:
         pass
     finally:
-        print("\nShutting down Secure Service...")
-        api_process.terminate()
-        print("System cleanup complete.")
+        print("\nShutting down Secure Service (draining in-flight requests)...")
+        supervisor.stop()
+        print(f"System cleanup complete ({supervisor.restarts} worker restart(s)).")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+class RecordCache:
+    """本地记录缓存 (SQLite): 只保存服务器返回的密文记录, 以及增量同步游标和 ETag.
+    标题与类型在服务器端本就是明文, payload 始终保持加密"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    @classmethod
+    def for_account(cls, cache_dir: str, base_url: str, username: str) -> "RecordCache":
+        """每个 (服务器, 用户) 一个缓存文件, 切换账号不会互相覆盖"""
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        name = hashlib.sha256(f"{base_url}|{username}".encode()).hexdigest()[:16]
+        return cls(os.path.join(cache_dir, f"records_{name}.db"))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def cursor(self) -> Optional[str]:
+        return self._get_meta("cursor")
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._get_meta("etag")
+
+    def apply(self, records: Iterable[dict], deleted: Iterable[int], cursor: Optional[str],
+              etag: Optional[str] = None):
+        """在一个事务中应用一页增量并推进游标; etag 仅在同步完成时写入"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM records WHERE id = ?", ((i,) for i in deleted))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (id, data) VALUES (?, ?)",
+                ((r["id"], json.dumps(r)) for r in records),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('cursor', ?)", (cursor,))
+            if etag is not None:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('etag', ?)", (etag,))
+
+    def records(self) -> List[dict]:
+        """按 ID 顺序返回全部缓存记录 (仍为密文)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM records ORDER BY id").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM records")
+            self._conn.execute("DELETE FROM meta")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,260 @@
+import asyncio
+import json
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+import httpx
+from cryptography.fernet import Fernet
+from .cognis_sdk import BATCH_SIZE, PAGE_SIZE
+from .records import PARALLEL_DECRYPT_THRESHOLD, SecretRecord, decrypt_all, derive_key, encrypt_record, project
+from .wire import ACCEPT, decode_body
+
+class AsyncCognisSDK:
+    """CognisSDK 的 asyncio 版本: 连接池 + 并发信号量, KDF 与加解密在线程中执行, 不阻塞事件循环"""
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8888", timeout: float = 5,
+                 max_connections: int = 100, max_concurrency: int = 64, retries: int = 3,
+                 compress_payloads: bool = False):
+        self.base_url = base_url
+        self.token: Optional[str] = None
+        self.encryption_key: Optional[bytes] = None
+        self.fernet: Optional[Fernet] = None
+        self.compress_payloads = compress_payloads
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            # Transport retries cover connection failures only, so they are safe for every method
+            transport=httpx.AsyncHTTPTransport(retries=retries),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        if self.token:
+            kwargs.setdefault("headers", {})["Authorization"] = f"Bearer {self.token}"
+        async with self._semaphore:
+            return await self._client.request(method, path, **kwargs)
+
+    async def check_connection(self) -> bool:
+        """检查与 API 服务器的连接是否正常"""
+        try:
+            response = await self._request("GET", "/docs")
+            return response.status_code in [200, 307, 404]
+        except httpx.HTTPError:
+            return False
+
+    async def register(self, username, password):
+        """注册新用户"""
+        try:
+            response = await self._request("POST", "/register", json={"username": username, "hashed_password": password})
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            return {"status": "error", "message": f"网络连接失败: {str(e)}"}
+
+    async def renew_token(self, username, password) -> bool:
+        """只重新获取访问令牌 (如在到期前刷新), 保留已派生的密钥, 不再执行 PBKDF2"""
+        try:
+            response = await self._request("POST", "/token", data={"username": username, "password": password})
+        except httpx.HTTPError:
+            return False
+        if response.status_code != 200:
+            return False
+        self.token = response.json().get("access_token")
+        return True
+
+    async def login(self, username, password) -> bool:
+        """登录并获取访问令牌; PBKDF2 派生在线程中执行"""
+        if not await self.renew_token(username, password):
+            return False
+        self.encryption_key = await asyncio.to_thread(derive_key, password)
+        self.fernet = Fernet(self.encryption_key)
+        return True
+
+    def _encrypt_rows(self, items: List[Tuple[str, str, str]]) -> List[dict]:
+        return [encrypt_record(self.fernet, *item, compress=self.compress_payloads) for item in items]
+
+    async def add_secret(self, title: str, service_type: str, raw_content: str):
+        """添加加密的密钥记录"""
+        if not self.fernet or not self.token:
+            return None
+        payload = (await asyncio.to_thread(self._encrypt_rows, [(title, service_type, raw_content)]))[0]
+        try:
+            response = await self._request("POST", "/records", json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError:
+            return None
+
+    async def add_secrets(self, items: Iterable[Tuple[str, str, str]], batch_size: int = BATCH_SIZE) -> List[int]:
+        """批量添加记录: 各批并发加密上传, 返回按输入顺序排列的 ID (失败的批次被跳过)"""
+        if not self.fernet or not self.token:
+            return []
+        items = iter(items)
+        chunks = list(iter(lambda: list(islice(items, batch_size)), []))
+
+        async def upload(chunk):
+            payload = await asyncio.to_thread(self._encrypt_rows, chunk)
+            try:
+                response = await self._request("POST", "/records/batch", json=payload)
+                response.raise_for_status()
+                return response.json()["ids"]
+            except httpx.HTTPError:
+                return []
+
+        return [i for ids in await asyncio.gather(*(upload(c) for c in chunks)) for i in ids]
+
+    async def update_secret(self, record_id: int, title: str, service_type: str, raw_content: str):
+        """更新密钥记录 (重新加密内容)"""
+        if not self.fernet or not self.token:
+            return None
+        payload = (await asyncio.to_thread(self._encrypt_rows, [(title, service_type, raw_content)]))[0]
+        try:
+            response = await self._request("PUT", f"/records/{record_id}", json=payload)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError:
+            return None
+
+    async def delete_secret(self, record_id: int) -> bool:
+        """删除密钥记录"""
+        if not self.token:
+            return False
+        try:
+            response = await self._request("DELETE", f"/records/{record_id}")
+        except httpx.HTTPError:
+            return False
+        return response.status_code == 200
+
+    async def _fetch_record(self, record_id: int) -> Optional[dict]:
+        try:
+            response = await self._request("GET", f"/records/{record_id}")
+        except httpx.HTTPError:
+            return None
+        return response.json() if response.status_code == 200 else None
+
+    async def get_secret(self, record_id: int) -> Optional[SecretRecord]:
+        """按 ID 获取单条密钥记录并解密"""
+        return (await self.get_secrets([record_id]))[0]
+
+    async def fetch_secret(self, record_id: int) -> Optional[SecretRecord]:
+        """按 ID 获取并解密单条记录; 仅在记录不存在时返回 None, 认证失败或网络错误抛出 httpx 异常"""
+        response = await self._request("GET", f"/records/{record_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        record = SecretRecord(response.json(), self.fernet)
+        await asyncio.to_thread(decrypt_all, [record])
+        return record
+
+    async def get_secrets(self, record_ids: Iterable[int]) -> List[Optional[SecretRecord]]:
+        """并发获取多条记录 (受并发信号量限制), 全部返回后在一个线程中统一解密"""
+        if not self.token:
+            return [None for _ in record_ids]
+        raw = await asyncio.gather(*(self._fetch_record(i) for i in record_ids))
+        secrets = [SecretRecord(r, self.fernet) for r in raw if r is not None]
+        await asyncio.to_thread(decrypt_all, secrets)
+        found = iter(secrets)
+        return [next(found) if r is not None else None for r in raw]
+
+    async def _iter_pages(self, path: str, page_size: int, params: dict) -> AsyncIterator[List[dict]]:
+        """首页失败时返回空 (同旧接口); 之后的页失败抛出 httpx 异常, 避免结果被静默截断"""
+        after_id = None
+        while True:
+            page_params = dict(params, limit=page_size)
+            if after_id is not None:
+                page_params["after_id"] = after_id
+            try:
+                response = await self._request("GET", path, params=page_params, headers={"Accept": ACCEPT})
+            except httpx.HTTPError:
+                if after_id is None:
+                    return
+                raise
+            if response.status_code != 200:
+                if after_id is None:
+                    return
+                raise httpx.HTTPStatusError(f"分页请求 {path} 失败: HTTP {response.status_code}",
+                                            request=response.request, response=response)
+            page = decode_body(response.headers.get("Content-Type", ""), response.content)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+
+    async def iter_secret_pages(self, page_size: int = PAGE_SIZE,
+                                fields: Optional[Sequence[str]] = None) -> AsyncIterator[List[dict]]:
+        """按页迭代密钥记录; 每页在线程中解密, fields 不含 payload 时跳过解密"""
+        if not self.token:
+            return
+        async for page in self._iter_pages("/records", page_size, {}):
+            yield await self._decrypt_batch(page, fields)
+
+    async def list_secrets(self, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """列出所有密钥并解密内容"""
+        return [r async for page in self.iter_secret_pages(fields=fields) for r in page]
+
+    async def search_secrets(self, query: str, limit: int = 20,
+                             fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """服务端全文检索标题与类型 (前缀匹配, 按相关度排序)"""
+        if not self.token or not query.strip():
+            return []
+        try:
+            response = await self._request("GET", "/records/search", params={"q": query, "limit": limit})
+        except httpx.HTTPError:
+            return []
+        if response.status_code != 200:
+            return []
+        return await self._decrypt_batch(response.json(), fields)
+
+    async def iter_secrets(self, fields: Optional[Sequence[str]] = None) -> AsyncIterator[dict]:
+        """流式导出全部密钥 (NDJSON), 按小批在线程中解密; 网络错误会直接抛出"""
+        if not self.token:
+            return
+        async with self._semaphore, self._client.stream(
+            "GET", "/records/export", headers={"Authorization": f"Bearer {self.token}"}
+        ) as response:
+            response.raise_for_status()
+            batch: List[dict] = []
+            async for line in response.aiter_lines():
+                if line:
+                    batch.append(json.loads(line))
+                if len(batch) >= PARALLEL_DECRYPT_THRESHOLD:
+                    for record in await self._decrypt_batch(batch, fields):
+                        yield record
+                    batch = []
+            for record in await self._decrypt_batch(batch, fields):
+                yield record
+
+    async def _decrypt_batch(self, records: List[dict], fields: Optional[Sequence[str]]) -> List[dict]:
+        if fields is not None and "payload" not in fields:
+            return project(records, fields)
+        secrets = await asyncio.to_thread(decrypt_all, [SecretRecord(r, self.fernet) for r in records])
+        return project(secrets, fields) if fields is not None else secrets
+
+    async def iter_audit_pages(self, page_size: int = PAGE_SIZE, since: Optional[datetime] = None,
+                               until: Optional[datetime] = None) -> AsyncIterator[List[dict]]:
+        """按页迭代审计日志, 可按时间范围 [since, until) 过滤"""
+        if not self.token:
+            return
+        params = {}
+        if since is not None:
+            params["since"] = since.isoformat()
+        if until is not None:
+            params["until"] = until.isoformat()
+        async for page in self._iter_pages("/audit", page_size, params):
+            yield page
+
+    async def get_audit_logs(self, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """获取审计日志"""
+        return [l async for page in self.iter_audit_pages(since=since, until=until) for l in page]
@@ -1,41 +1,103 @@
+import json
 import requests
-import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime
+from typing import Callable, Optional, List, Iterator, Iterable, Sequence, Tuple
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .cache import RecordCache
+from .records import DECRYPT_WORKERS, SecretRecord, decrypt_all, derive_key, encrypt_record, project
+from .rotation import KeyRotator, RotationIncomplete
+from .wire import ACCEPT, decode_body
+
+# Page size for keyset pagination (the API caps pages at 1000 rows)
+PAGE_SIZE = 500
+# Records per POST /records/batch request (the API caps batches at 1000)
+BATCH_SIZE = 500
+# Only idempotent requests are retried after they reached the server (connect errors are always retried)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
 
 class CognisSDK:
-    def __init__(self, base_url: str = "http://127.0.0.1:8888", timeout: int = 5):
+    def __init__(self, base_url: str = "http://127.0.0.1:8888", timeout: int = 5,
+                 pool_size: int = 10, keep_alive: bool = True, retries: int = 3, backoff: float = 0.2,
+                 cache_dir: Optional[str] = None, compress_payloads: bool = False):
         self.base_url = base_url
         self.token: Optional[str] = None
         self.encryption_key: Optional[bytes] = None
         self.timeout = timeout
+        self.session = self._build_session(pool_size, keep_alive, retries, backoff)
+        self._fernet: Optional[Fernet] = None
+        self._fernet_key: Optional[bytes] = None
+        self._decrypt_pool: Optional[ThreadPoolExecutor] = None
+        # 设置 cache_dir 后, list_secrets 通过增量同步读取本地密文缓存
+        self.cache_dir = cache_dir
+        self.cache: Optional[RecordCache] = None
+        # 加密前压缩长内容 (默认关闭: 压缩后的密文长度会泄露内容的冗余程度)
+        self.compress_payloads = compress_payloads
+
+    @staticmethod
+    def _build_session(pool_size: int, keep_alive: bool, retries: int, backoff: float) -> requests.Session:
+        """共享连接池会话: keep-alive 复用 TCP 连接, 幂等请求按抖动指数退避重试"""
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            backoff_jitter=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self):
+        """关闭连接池、解密线程池和本地缓存"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if self._decrypt_pool is not None:
+            self._decrypt_pool.shutdown(wait=False)
+            self._decrypt_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def check_connection(self) -> bool:
         """检查与 API 服务器的连接是否正常"""
         try:
-            response = requests.get(f"{self.base_url}/docs", timeout=self.timeout)
+            response = self.session.get(f"{self.base_url}/docs", timeout=self.timeout)
             return response.status_code in [200, 307, 404]  # API 存活即可
         except (requests.ConnectionError, requests.Timeout, requests.RequestException):
             return False
 
     def _derive_key(self, password: str, salt: bytes = b'cognis_static_salt'):
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key
+        return derive_key(password, salt)
+
+    @property
+    def fernet(self) -> Fernet:
+        """复用的 Fernet 实例, 仅在 encryption_key 变化时重建"""
+        if self._fernet is None or self._fernet_key != self.encryption_key:
+            self._fernet = Fernet(self.encryption_key)
+            self._fernet_key = self.encryption_key
+        return self._fernet
 
     def register(self, username, password):
         """注册新用户"""
         try:
             payload = {"username": username, "hashed_password": password}
-            response = requests.post(f"{self.base_url}/register", json=payload, timeout=self.timeout)
+            response = self.session.post(f"{self.base_url}/register", json=payload, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -44,7 +106,7 @@ class CognisSDK:
     def login(self, username, password):
         """登录并获取访问令牌"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/token", 
                 data={"username": username, "password": password},
                 timeout=self.timeout
@@ -53,27 +115,63 @@ class CognisSDK:
                 self.token = response.json().get("access_token")
                 # Crucial: Derive encryption key from password locally
                 self.encryption_key = self._derive_key(password)
+                if self.cache_dir is not None:
+                    if self.cache is not None:
+                        self.cache.close()
+                    self.cache = RecordCache.for_account(self.cache_dir, self.base_url, username)
                 return True
             return False
         except requests.RequestException:
             return False
 
+    def rotate_key(self, new_key: bytes, checkpoint_path: Optional[str] = None, workers: int = DECRYPT_WORKERS,
+                   progress=None) -> dict:
+        """用新密钥重新加密全部记录 (可从检查点继续), 完成后切换到新密钥并返回吞吐统计.
+        有记录未能轮换时抛出 RotationIncomplete, 保留旧密钥与检查点"""
+        rotator = KeyRotator(self, new_key, [self.encryption_key], checkpoint_path, PAGE_SIZE, workers, progress=progress)
+        report = rotator.run()
+        if report["failed"]:
+            raise RotationIncomplete(report)
+        self.encryption_key = new_key
+        rotator.discard_checkpoint()
+        return report
+
+    def change_password(self, current_password: str, new_password: str, checkpoint_path: Optional[str] = None,
+                        workers: int = DECRYPT_WORKERS, progress=None) -> dict:
+        """修改主密码: 先把全部记录轮换到新密码派生的密钥, 再更新服务端密码.
+        中断后以相同参数重新调用即从检查点继续; 在此之前已轮换的记录需用新密码才能解密.
+        有记录未能轮换时抛出 RotationIncomplete, 不修改服务端密码, 检查点保留供重试"""
+        if not self.token:
+            raise RuntimeError("未登录")
+        old_key = self._derive_key(current_password)
+        if old_key != self.encryption_key:
+            raise ValueError("当前密码错误")
+        new_key = self._derive_key(new_password)
+        rotator = KeyRotator(self, new_key, [old_key], checkpoint_path, PAGE_SIZE, workers, progress=progress)
+        report = rotator.run()
+        if report["failed"]:
+            raise RotationIncomplete(report)
+        response = self.session.post(
+            f"{self.base_url}/users/me/password",
+            json={"current_password": current_password, "new_password": new_password},
+            headers={"Authorization": f"Bearer {self.token}"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+        self.encryption_key = new_key
+        rotator.discard_checkpoint()
+        return report
+
     def add_secret(self, title: str, service_type: str, raw_content: str):
         """添加加密的密钥记录"""
         if not self.encryption_key or not self.token: 
             return None
         
         try:
-            f = Fernet(self.encryption_key)
-            encrypted_data = f.encrypt(raw_content.encode()).decode()
-            
             headers = {"Authorization": f"Bearer {self.token}"}
-            payload = {
-                "title": title,
-                "service_type": service_type,
-                "encrypted_payload": encrypted_data
-            }
-            response = requests.post(
+            payload = encrypt_record(self.fernet, title, service_type, raw_content, self.compress_payloads)
+            response = self.session.post(
                 f"{self.base_url}/records", 
                 json=payload, 
                 headers=headers,
@@ -84,47 +182,228 @@ class CognisSDK:
         except requests.RequestException:
             return None
 
-    def list_secrets(self) -> List[dict]:
-        """列出所有密钥并解密内容"""
-        if not self.token: 
+    def add_secrets(self, items: Iterable[Tuple[str, str, str]], batch_size: int = BATCH_SIZE) -> List[int]:
+        """批量添加 (title, service_type, raw_content) 记录, 按批加密上传, 返回已写入的记录 ID"""
+        if not self.encryption_key or not self.token:
             return []
-        
+
+        f = self.fernet
+        headers = {"Authorization": f"Bearer {self.token}"}
+        ids: List[int] = []
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, batch_size))
+            if not chunk:
+                return ids
+            payload = [encrypt_record(f, *item, compress=self.compress_payloads) for item in chunk]
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/records/batch",
+                    json=payload,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+            except requests.RequestException:
+                return ids
+            ids.extend(response.json()["ids"])
+
+    def update_secret(self, record_id: int, title: str, service_type: str, raw_content: str):
+        """更新密钥记录 (重新加密内容)"""
+        if not self.encryption_key or not self.token:
+            return None
+        payload = encrypt_record(self.fernet, title, service_type, raw_content, self.compress_payloads)
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.get(
-                f"{self.base_url}/records", 
-                headers=headers,
+            response = self.session.put(
+                f"{self.base_url}/records/{record_id}",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.token}"},
                 timeout=self.timeout
             )
-            if response.status_code != 200: 
-                return []
-            
-            records = response.json()
-            f = Fernet(self.encryption_key)
-            
-            decrypted_results = []
-            for r in records:
-                try:
-                    r['payload'] = f.decrypt(r['encrypted_payload'].encode()).decode()
-                except:
-                    r['payload'] = "[Decryption Failed]"
-                decrypted_results.append(r)
-            return decrypted_results
+            response.raise_for_status()
+            return response.json()
         except requests.RequestException:
-            return []
+            return None
 
-    def get_audit_logs(self):
-        """获取审计日志"""
-        if not self.token: 
+    def delete_secret(self, record_id: int) -> bool:
+        """删除密钥记录"""
+        if not self.token:
+            return False
+        try:
+            response = self.session.delete(
+                f"{self.base_url}/records/{record_id}",
+                headers={"Authorization": f"Bearer {self.token}"},
+                timeout=self.timeout
+            )
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def get_secret(self, record_id: int) -> Optional[SecretRecord]:
+        """按 ID 获取单条密钥记录 (payload 惰性解密)"""
+        if not self.token:
+            return None
+        try:
+            response = self.session.get(
+                f"{self.base_url}/records/{record_id}",
+                headers={"Authorization": f"Bearer {self.token}"},
+                timeout=self.timeout
+            )
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return SecretRecord(response.json(), self.fernet)
+
+    def _iter_pages(self, path: str, page_size: int, params: dict, strict: bool = False) -> Iterator[List[dict]]:
+        """按 after_id 游标逐页拉取, 直到返回不足一页 (服务端支持时使用 msgpack).
+        首页失败时同旧接口一样返回空; 之后的页失败会抛出 requests 异常, 避免结果被静默截断 (strict 时首页也抛出)"""
+        headers = {"Authorization": f"Bearer {self.token}", "Accept": ACCEPT}
+        after_id = None
+        while True:
+            page_params = dict(params, limit=page_size)
+            if after_id is not None:
+                page_params["after_id"] = after_id
+            lenient = after_id is None and not strict
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{path}",
+                    params=page_params,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+            except requests.RequestException:
+                if lenient:
+                    return
+                raise
+            if response.status_code != 200:
+                if lenient:
+                    return
+                raise requests.HTTPError(f"分页请求 {path} 失败: HTTP {response.status_code}", response=response)
+            page = decode_body(response.headers.get("Content-Type", ""), response.content)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+
+    def _wrap_records(self, records: List[dict], fields: Optional[Sequence[str]], lazy: bool) -> List[dict]:
+        if fields is not None and "payload" not in fields:
+            return project(records, fields)
+        secrets = [SecretRecord(r, self.fernet) for r in records]
+        if not lazy:
+            self.decrypt_records(secrets)
+        return project(secrets, fields) if fields is not None else secrets
+
+    def decrypt_records(self, records: List[SecretRecord]) -> List[SecretRecord]:
+        """立即解密一批惰性记录, 大列表在线程池中并行"""
+        if self._decrypt_pool is None:
+            self._decrypt_pool = ThreadPoolExecutor(max_workers=DECRYPT_WORKERS, thread_name_prefix="cognis-decrypt")
+        return decrypt_all(records, self._decrypt_pool)
+
+    def iter_secret_pages(self, page_size: int = PAGE_SIZE, fields: Optional[Sequence[str]] = None,
+                          lazy: bool = True) -> Iterator[List[dict]]:
+        """按页迭代密钥记录; payload 默认惰性解密, fields 不含 payload 时完全跳过解密"""
+        if not self.token:
+            return
+        for page in self._iter_pages("/records", page_size, {}):
+            yield self._wrap_records(page, fields, lazy)
+
+    def sync(self, page_size: int = PAGE_SIZE, progress: Optional[Callable[[int], None]] = None) -> bool:
+        """把服务器变更增量同步到本地缓存; 无变化时仅一次 304 往返. 返回是否同步完成.
+        progress 在每页应用后收到累计变更数 (可在其中抛出异常以中止, 已应用的页保持有效)"""
+        if not self.token or self.cache is None:
+            return False
+        headers = {"Authorization": f"Bearer {self.token}", "Accept": ACCEPT}
+        applied = 0
+        etag = self.cache.etag
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        while True:
+            params = {"limit": page_size}
+            cursor = self.cache.cursor
+            if cursor is not None:
+                params["since"] = cursor
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/records/changes",
+                    params=params,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+            except requests.RequestException:
+                return False
+            if response.status_code == 304:
+                return True
+            if response.status_code != 200:
+                return False
+            changes = decode_body(response.headers.get("Content-Type", ""), response.content)
+            # The ETag describes the whole vault, so it is stored only once the last page is applied
+            done = not changes["has_more"]
+            self.cache.apply(changes["records"], changes["deleted"], changes["cursor"],
+                             response.headers.get("ETag") if done else None)
+            applied += len(changes["records"]) + len(changes["deleted"])
+            if progress is not None:
+                progress(applied)
+            if done:
+                return True
+            headers.pop("If-None-Match", None)
+
+    def list_secrets(self, fields: Optional[Sequence[str]] = None, lazy: bool = True,
+                     progress: Optional[Callable[[int], None]] = None) -> List[dict]:
+        """列出所有密钥; payload 首次访问时解密 (lazy=False 则批量并行解密).
+        启用缓存时先增量同步 (progress 同 sync), 同步失败则返回上次缓存的内容"""
+        if self.cache is not None and self.token:
+            self.sync(progress=progress)
+            return self._wrap_records(self.cache.records(), fields, lazy)
+        return [r for page in self.iter_secret_pages(fields=fields, lazy=lazy) for r in page]
+
+    def search_secrets(self, query: str, limit: int = 20, fields: Optional[Sequence[str]] = None,
+                       lazy: bool = True) -> List[dict]:
+        """服务端全文检索标题与类型 (前缀匹配, 按相关度排序)"""
+        if not self.token or not query.strip():
             return []
         try:
-            headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.get(
-                f"{self.base_url}/audit", 
-                headers=headers,
+            response = self.session.get(
+                f"{self.base_url}/records/search",
+                params={"q": query, "limit": limit},
+                headers={"Authorization": f"Bearer {self.token}"},
                 timeout=self.timeout
             )
-            response.raise_for_status()
-            return response.json()
         except requests.RequestException:
             return []
+        if response.status_code != 200:
+            return []
+        return self._wrap_records(response.json(), fields, lazy)
+
+    def iter_secrets(self, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """流式导出全部密钥 (NDJSON): 逐行解析、逐条解密, 内存占用与库大小无关.
+        网络错误会直接抛出, 避免备份被静默截断"""
+        if not self.token:
+            return
+        with self.session.get(
+            f"{self.base_url}/records/export",
+            headers={"Authorization": f"Bearer {self.token}"},
+            stream=True,
+            timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=64 * 1024):
+                if line:
+                    yield self._wrap_records([json.loads(line)], fields, lazy=False)[0]
+
+    def iter_audit_pages(self, page_size: int = PAGE_SIZE, since: Optional[datetime] = None,
+                         until: Optional[datetime] = None) -> Iterator[List[dict]]:
+        """按页迭代审计日志, 可按时间范围 [since, until) 过滤; 首页之后的请求失败会抛出异常"""
+        if not self.token:
+            return
+        params = {}
+        if since is not None:
+            params["since"] = since.isoformat()
+        if until is not None:
+            params["until"] = until.isoformat()
+        yield from self._iter_pages("/audit", page_size, params)
+
+    def get_audit_logs(self, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """获取审计日志; 中途分页失败抛出异常而不是返回不完整的列表"""
+        return [l for page in self.iter_audit_pages(since=since, until=until) for l in page]
@@ -0,0 +1,87 @@
+import base64
+import os
+import zlib
+from concurrent.futures import Executor
+from typing import Iterable, List, Optional, Sequence, Tuple
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+DECRYPTION_FAILED = "[Decryption Failed]"
+# Below this many records a thread pool costs more than it saves
+PARALLEL_DECRYPT_THRESHOLD = 256
+DECRYPT_WORKERS = min(4, os.cpu_count() or 1)
+# 短内容压缩收益为负, 只有足够长且能缩小 10% 以上时才压缩
+COMPRESS_MIN_SIZE = 256
+
+def derive_key(password: str, salt: bytes = b'cognis_static_salt') -> bytes:
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+
+def encrypt_payload(fernet: Fernet, raw_content: str, compress: bool = False) -> Tuple[str, str]:
+    """加密明文, 返回 (token, payload_encoding); compress=True 时先 zlib 压缩 (密文长度会反映内容的可压缩性)"""
+    data = raw_content.encode()
+    encoding = ""
+    if compress and len(data) >= COMPRESS_MIN_SIZE:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data) * 0.9:
+            data, encoding = packed, "zlib"
+    return fernet.encrypt(data).decode(), encoding
+
+def encrypt_record(fernet: Fernet, title: str, service_type: str, raw_content: str, compress: bool = False) -> dict:
+    token, encoding = encrypt_payload(fernet, raw_content, compress)
+    return {"title": title, "service_type": service_type, "encrypted_payload": token, "payload_encoding": encoding}
+
+def decrypt_payload(fernet: Fernet, token: str, encoding: str = "") -> str:
+    try:
+        data = fernet.decrypt(token.encode())
+        if encoding == "zlib":
+            data = zlib.decompress(data)
+        return data.decode()
+    except Exception:
+        return DECRYPTION_FAILED
+
+class SecretRecord(dict):
+    """密钥记录: payload 在首次访问时才解密, 结果缓存在记录上"""
+
+    def __init__(self, data: dict, fernet: Fernet):
+        super().__init__(data)
+        self._fernet = fernet
+
+    def __missing__(self, key):
+        if key != "payload" or "encrypted_payload" not in self:
+            raise KeyError(key)
+        value = decrypt_payload(self._fernet, self["encrypted_payload"], self.get("payload_encoding") or "")
+        self["payload"] = value
+        return value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (key == "payload" and super().__contains__("encrypted_payload"))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    @property
+    def is_decrypted(self) -> bool:
+        return super().__contains__("payload")
+
+def project(records: Iterable[dict], fields: Sequence[str]) -> List[dict]:
+    # fields without "payload" never touch the ciphertext
+    return [{field: r[field] for field in fields if field in r} for r in records]
+
+def decrypt_all(records: List[SecretRecord], executor: Optional[Executor] = None) -> List[SecretRecord]:
+    """批量解密; 记录较多且提供线程池时分块并行"""
+    pending = [r for r in records if not r.is_decrypted]
+    if executor is None or len(pending) < PARALLEL_DECRYPT_THRESHOLD:
+        for r in pending:
+            r["payload"]
+        return records
+    chunk = -(-len(pending) // DECRYPT_WORKERS)
+    chunks = [pending[i:i + chunk] for i in range(0, len(pending), chunk)]
+    list(executor.map(lambda part: [r["payload"] for r in part], chunks))
+    return records
@@ -0,0 +1,179 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from .records import DECRYPT_WORKERS
+
+# 检查点里的标记密文: 只有同一个新密钥能解开, 用来确认检查点属于本次轮换 (文件中不保存任何密钥)
+CHECKPOINT_MARKER = b"cognis-key-rotation"
+
+class RotationIncomplete(RuntimeError):
+    """轮换结束但仍有记录未能用新密钥重新加密; report 为 run() 的统计, 检查点保留以便重试"""
+
+    def __init__(self, report: dict):
+        failed = report["failed"]
+        shown = ", ".join(str(i) for i in failed[:10]) + (" ..." if len(failed) > 10 else "")
+        super().__init__(f"{len(failed)} 条记录未能轮换 (ID: {shown}), 密码与密钥均未切换; 重新运行即重试这些记录")
+        self.report = report
+
+class KeyRotator:
+    """批量密钥轮换: 按页拉取记录, 多线程用新密钥重新加密, 带版本号批量写回.
+    每写完一批就更新检查点文件, 中断后用相同的密钥重新运行即从断点继续"""
+
+    def __init__(self, sdk, new_key: bytes, old_keys: Sequence[bytes], checkpoint_path: Optional[str] = None,
+                 page_size: int = 500, workers: int = DECRYPT_WORKERS, max_retries: int = 3,
+                 progress: Optional[Callable[[dict], None]] = None):
+        self.sdk = sdk
+        self.checkpoint_path = checkpoint_path
+        self.page_size = page_size
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.progress = progress
+        self._new = Fernet(new_key)
+        # rotate() 可解开任一密钥加密的内容 (包括上次中断前已写入的新密文), 总是用新密钥重新加密
+        self._fernet = MultiFernet([self._new] + [Fernet(k) for k in old_keys])
+        self.state = self._load_checkpoint()
+
+    def _fresh_state(self) -> dict:
+        return {"marker": self._new.encrypt(CHECKPOINT_MARKER).decode(), "after_id": None,
+                "rotated": 0, "skipped": 0, "failed": [], "records_done": False}
+
+    def _load_checkpoint(self) -> dict:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return self._fresh_state()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            state = json.load(f)
+        try:
+            self._new.decrypt(state["marker"].encode())
+        except (InvalidToken, KeyError):
+            raise ValueError("检查点属于另一次密钥轮换, 请删除后重试") from None
+        return state
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        # 先写临时文件再原子替换, 崩溃时不会留下半个检查点
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def discard_checkpoint(self):
+        """轮换彻底完成后删除检查点"""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _rotate(self, records: List[dict]) -> Tuple[List[dict], List[int]]:
+        rows, failed = [], []
+        for r in records:
+            try:
+                token = self._fernet.rotate(r["encrypted_payload"].encode()).decode()
+            except InvalidToken:
+                failed.append(r["id"])
+                continue
+            # payload_encoding 描述的是明文字节, 重新加密后保持不变
+            rows.append({"id": r["id"], "version": r.get("version", 1), "encrypted_payload": token,
+                         "payload_encoding": r.get("payload_encoding", "")})
+        return rows, failed
+
+    def _rotate_parallel(self, pool: ThreadPoolExecutor, records: List[dict]) -> Tuple[List[dict], List[int]]:
+        chunk = -(-len(records) // self.workers)
+        rows, failed = [], []
+        for part_rows, part_failed in pool.map(self._rotate, [records[i:i + chunk] for i in range(0, len(records), chunk)]):
+            rows += part_rows
+            failed += part_failed
+        return rows, failed
+
+    def _put_batch(self, rows: List[dict]) -> List[int]:
+        response = self.sdk.session.put(
+            f"{self.sdk.base_url}/records/batch",
+            json=rows,
+            headers={"Authorization": f"Bearer {self.sdk.token}"},
+            timeout=self.sdk.timeout
+        )
+        response.raise_for_status()
+        return response.json()["conflicts"]
+
+    def _fetch(self, record_id: int) -> Optional[dict]:
+        # 与 get_secret 不同: 只有 404 表示记录已删除, 其他错误直接抛出
+        response = self.sdk.session.get(
+            f"{self.sdk.base_url}/records/{record_id}",
+            headers={"Authorization": f"Bearer {self.sdk.token}"},
+            timeout=self.sdk.timeout
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _write(self, rows: List[dict]) -> Tuple[int, int, List[int]]:
+        """写回一批; 版本冲突的记录重新获取并轮换后重试, 已被删除的记录计为跳过"""
+        written = skipped = 0
+        failed: List[int] = []
+        for _ in range(self.max_retries + 1):
+            if not rows:
+                break
+            conflicts = set(self._put_batch(rows))
+            written += len(rows) - len(conflicts)
+            fresh = [r for r in (self._fetch(i) for i in conflicts) if r is not None]
+            skipped += len(conflicts) - len(fresh)
+            rows, rotate_failed = self._rotate(fresh)
+            failed += rotate_failed
+        # 重试耗尽仍在被并发修改的记录留给下次轮换
+        return written, skipped, failed + [r["id"] for r in rows]
+
+    def _retry_failed(self) -> int:
+        """重试检查点中上次失败的记录: 已删除的计为跳过, 仍失败的留在 failed 中"""
+        state = self.state
+        ids, state["failed"] = state["failed"], []
+        fresh = [r for r in (self._fetch(i) for i in ids) if r is not None]
+        state["skipped"] += len(ids) - len(fresh)
+        rows, failed = self._rotate(fresh)
+        written, skipped, write_failed = self._write(rows)
+        state["rotated"] += written
+        state["skipped"] += skipped
+        state["failed"] = failed + write_failed
+        self._save_checkpoint()
+        return written
+
+    def run(self) -> dict:
+        """执行 (或继续) 轮换, 返回统计: 本次轮换数、跳过数、失败 ID、耗时与每秒记录数.
+        网络错误会直接抛出, 已完成的批次保存在检查点中; 检查点里上次失败的记录会先重试"""
+        state = self.state
+        started = time.perf_counter()
+        rotated = self._retry_failed() if state["failed"] else 0
+        if not state["records_done"]:
+            params = {} if state["after_id"] is None else {"after_id": state["after_id"]}
+            # strict: 任何一页 (包括从检查点继续时的第一页) 失败都抛出, 不会把中断误当作到达末尾
+            pages = self.sdk._iter_pages("/records", self.page_size, params, strict=True)
+            with ThreadPoolExecutor(max_workers=self.workers + 1, thread_name_prefix="cognis-rotate") as pool:
+                pending = pool.submit(next, pages, None)
+                while True:
+                    page = pending.result()
+                    if page is None:
+                        break
+                    # 当前页加密、写回的同时预取下一页
+                    pending = pool.submit(next, pages, None)
+                    rows, failed = self._rotate_parallel(pool, page)
+                    written, skipped, write_failed = self._write(rows)
+                    rotated += written
+                    state["rotated"] += written
+                    state["skipped"] += skipped
+                    state["failed"] += failed + write_failed
+                    state["after_id"] = page[-1]["id"]
+                    self._save_checkpoint()
+                    if self.progress is not None:
+                        self.progress(dict(state, elapsed=time.perf_counter() - started))
+            state["records_done"] = True
+            self._save_checkpoint()
+        elapsed = time.perf_counter() - started
+        return {
+            "rotated": rotated,
+            "total_rotated": state["rotated"],
+            "skipped": state["skipped"],
+            "failed": list(state["failed"]),
+            "elapsed": elapsed,
+            "records_per_second": rotated / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Any
+
+# msgpack 为可选依赖: 未安装时只请求 JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# 优先请求紧凑的 msgpack; 旧服务端或未协商的接口仍返回 JSON
+ACCEPT = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.9" if msgpack is not None else "application/json"
+
+def decode_body(content_type: str, body: bytes) -> Any:
+    """按 Content-Type 解码响应; msgpack 中的二进制 token 还原为 base64 文本, 与 JSON 结果完全一致"""
+    if msgpack is None or not content_type.startswith(MSGPACK_MEDIA_TYPE):
+        return json.loads(body)
+    data = msgpack.unpackb(body, raw=False)
+    records = data.get("records", []) if isinstance(data, dict) else data
+    for record in records:
+        token = record.get("encrypted_payload")
+        if isinstance(token, bytes):
+            record["encrypted_payload"] = base64.urlsafe_b64encode(token).decode()
+    return data
@@ -0,0 +1,64 @@
+"""
+Fan-out benchmark: 1k secret reads with AsyncCognisSDK vs the blocking SDK.
+
+Starts the vault API with uvicorn (temp database), seeds records, then
+reads them by ID serially with CognisSDK.get_secret and concurrently with
+AsyncCognisSDK.get_secrets at several concurrency limits.
+
+    python projects/cognis_vault/tests/bench_async_sdk.py --reads 1000 --concurrency 16 64 256
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from bench_sdk_http import start_server
+from projects.cognis_vault.sdk.cognis_async_sdk import AsyncCognisSDK
+from projects.cognis_vault.sdk.cognis_sdk import CognisSDK
+from projects.common.bench import free_port
+
+USER, PASSWORD = "bench_user", "SecurePass123!"
+
+async def async_reads(base_url: str, ids, concurrency: int) -> float:
+    async with AsyncCognisSDK(base_url, max_concurrency=concurrency, max_connections=concurrency) as sdk:
+        await sdk.login(USER, PASSWORD)
+        started = time.perf_counter()
+        records = await sdk.get_secrets(ids)
+        elapsed = time.perf_counter() - started
+    assert all(r is not None and r["payload"].startswith("value_") for r in records)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=1000, help="secret reads per mode")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256], help="async concurrency limits")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        with CognisSDK(base_url) as sdk:
+            sdk.register(USER, PASSWORD)
+            sdk.login(USER, PASSWORD)
+            ids = sdk.add_secrets((f"secret_{i}", "Bench", f"value_{i}") for i in range(args.reads))
+
+            print(f"=== Cognis Vault Fan-Out: {len(ids)} secret reads ===")
+            started = time.perf_counter()
+            for record_id in ids:
+                sdk.get_secret(record_id)["payload"]
+            elapsed = time.perf_counter() - started
+            print(f"{'sync serial':>18}: {elapsed:.2f}s  {len(ids) / elapsed:.0f} reads/s")
+
+        for concurrency in args.concurrency:
+            elapsed = asyncio.run(async_reads(base_url, ids, concurrency))
+            print(f"{f'async x{concurrency}':>18}: {elapsed:.2f}s  {len(ids) / elapsed:.0f} reads/s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
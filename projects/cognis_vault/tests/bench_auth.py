@@ -0,0 +1,88 @@
+"""
+Login-under-load benchmark for the Cognis Vault API.
+
+Drives the app in-process over an ASGI transport, so everything shares one
+event loop exactly like a single uvicorn worker. Concurrent login loops run
+next to authenticated GET /records loops; the run is repeated with inline
+Argon2 (workers=0, the old behavior) and with the process pool.
+
+    python projects/cognis_vault/tests/bench_auth.py --duration 10 --logins 16 --readers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Workspace root on sys.path so the API package imports resolve
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from projects.common.bench import percentile, temp_database_url
+os.environ.setdefault("COGNIS_DATABASE_URL", temp_database_url("bench_auth.db"))
+
+import httpx
+from projects.cognis_vault.api import main as api
+from projects.cognis_vault.api.hashing import PasswordHasherPool
+
+PASSWORD = "SecurePass123!"
+
+async def run_mode(workers: int, args) -> dict:
+    api.password_hasher = PasswordHasherPool(workers, max_pending=args.queue_depth)
+    login_latencies, counters = [], {"rejected": 0, "reads": 0}
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.app.router.lifespan_context(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            user = f"bench_{workers}_{time.time_ns()}"
+            credentials = {"username": user, "password": PASSWORD}
+            await client.post("/register", json={"username": user, "hashed_password": PASSWORD})
+            token = (await client.post("/token", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            deadline = time.perf_counter() + args.duration
+
+            async def login_loop():
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    response = await client.post("/token", data=credentials)
+                    if response.status_code == 503:
+                        counters["rejected"] += 1
+                        await asyncio.sleep(0.01)
+                        continue
+                    login_latencies.append(time.perf_counter() - started)
+
+            async def read_loop():
+                while time.perf_counter() < deadline:
+                    await client.get("/records", headers=headers)
+                    counters["reads"] += 1
+
+            await asyncio.gather(
+                *(login_loop() for _ in range(args.logins)),
+                *(read_loop() for _ in range(args.readers)),
+            )
+
+    return {
+        "workers": workers,
+        "logins": len(login_latencies),
+        "login_p50_ms": percentile(login_latencies, 50) * 1000,
+        "login_p99_ms": percentile(login_latencies, 99) * 1000,
+        "rejected_503": counters["rejected"],
+        "reads_per_sec": counters["reads"] / args.duration,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login loops")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent GET /records loops")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="process pool size")
+    parser.add_argument("--queue-depth", type=int, default=64, help="max pending hash jobs")
+    args = parser.parse_args()
+
+    print("=== Cognis Vault Login-Under-Load Benchmark ===")
+    for workers in (0, args.workers):
+        result = asyncio.run(run_mode(workers, args))
+        mode = "inline" if workers == 0 else f"pool({workers})"
+        print(f"{mode:>10}: logins={result['logins']:<5} p50={result['login_p50_ms']:.1f}ms "
+              f"p99={result['login_p99_ms']:.1f}ms 503s={result['rejected_503']:<4} "
+              f"non-auth reads/s={result['reads_per_sec']:.1f}")
+
+if __name__ == "__main__":
+    main()
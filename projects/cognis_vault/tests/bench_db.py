@@ -0,0 +1,130 @@
+"""
+Mixed read/write database benchmark for the Cognis Vault storage layer.
+
+"before" replays the old setup: a sync SQLAlchemy engine with default
+journaling, used from inside coroutines (every query blocks the event loop).
+"after" uses the async aiosqlite engine from api/db.py with WAL,
+synchronous=NORMAL, a connection pool and the in-process writer queue. Each
+worker issues keyset page reads of vault records and record+audit writes.
+
+    python projects/cognis_vault/tests/bench_db.py --duration 10 --concurrency 32 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from projects.cognis_vault.api.db import build_engine, init_db, write_lock
+from projects.cognis_vault.api.models import AuditLog, User, VaultRecord
+from projects.common.bench import percentile, temp_dir
+
+OWNERS = 20
+
+def seed(sync_engine, records_per_owner: int):
+    now = datetime.utcnow()
+    with Session(sync_engine) as session:
+        session.execute(insert(User), [
+            {"id": i, "username": f"owner_{i}", "hashed_password": "x", "is_active": True, "created_at": now}
+            for i in range(1, OWNERS + 1)
+        ])
+        session.execute(insert(VaultRecord), [
+            {"title": f"seed_{i}", "service_type": "Bench", "encrypted_payload": "x" * 120,
+             "owner_id": i % OWNERS + 1, "created_at": now, "updated_at": now}
+            for i in range(records_per_owner * OWNERS)
+        ])
+        session.commit()
+
+def new_record(owner_id: int):
+    return (VaultRecord(title="bench", service_type="Bench", encrypted_payload="x" * 120, owner_id=owner_id),
+            AuditLog(user_id=owner_id, action="CREATE_RECORD: bench"))
+
+def page_query(owner_id: int):
+    return select(VaultRecord).where(VaultRecord.owner_id == owner_id).order_by(VaultRecord.id).limit(50)
+
+async def drive(args, read_op, write_op) -> dict:
+    reads, writes = [], []
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(seed_value: int):
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            owner_id = rng.randint(1, OWNERS)
+            is_write = rng.random() < args.write_ratio
+            started = time.perf_counter()
+            await (write_op if is_write else read_op)(owner_id)
+            (writes if is_write else reads).append(time.perf_counter() - started)
+            await asyncio.sleep(0)  # request boundary
+
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return {
+        "reads_per_sec": len(reads) / args.duration,
+        "writes_per_sec": len(writes) / args.duration,
+        "read_p99_ms": percentile(reads, 99) * 1000,
+        "write_p99_ms": percentile(writes, 99) * 1000,
+    }
+
+async def run_before(path: str, args) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    seed(engine, args.records)
+
+    async def read_op(owner_id):
+        with Session(engine) as session:
+            session.exec(page_query(owner_id)).all()
+
+    async def write_op(owner_id):
+        with Session(engine) as session:
+            session.add_all(new_record(owner_id))
+            session.commit()
+
+    try:
+        return await drive(args, read_op, write_op)
+    finally:
+        engine.dispose()
+
+async def run_after(path: str, args) -> dict:
+    engine = build_engine(f"sqlite+aiosqlite:///{path}")
+    await init_db(engine)
+    seed_engine = create_engine(f"sqlite:///{path}")
+    seed(seed_engine, args.records)
+    seed_engine.dispose()
+
+    async def read_op(owner_id):
+        async with AsyncSession(engine) as session:
+            (await session.exec(page_query(owner_id))).all()
+
+    async def write_op(owner_id):
+        async with AsyncSession(engine) as session, write_lock():
+            session.add_all(new_record(owner_id))
+            await session.commit()
+
+    try:
+        return await drive(args, read_op, write_op)
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent workers")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of write operations")
+    parser.add_argument("--records", type=int, default=500, help="seed records per owner")
+    args = parser.parse_args()
+
+    print("=== Cognis Vault Mixed Read/Write DB Benchmark ===")
+    workdir = temp_dir()
+    for name, runner in (("before", run_before), ("after", run_after)):
+        result = asyncio.run(runner(os.path.join(workdir, f"{name}.db"), args))
+        print(f"{name:>7}: reads/s={result['reads_per_sec']:.0f} writes/s={result['writes_per_sec']:.0f} "
+              f"read p99={result['read_p99_ms']:.1f}ms write p99={result['write_p99_ms']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
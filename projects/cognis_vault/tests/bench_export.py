@@ -0,0 +1,59 @@
+"""
+Client memory benchmark: list_secrets() vs streaming iter_secrets().
+
+Starts the vault API with uvicorn (temp database), grows the vault through
+several sizes and, at each size, walks every record both ways while
+tracemalloc records the client's peak Python heap. The streaming path
+should stay flat as the vault grows.
+
+    python projects/cognis_vault/tests/bench_export.py --sizes 5000 20000 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from bench_sdk_http import start_server
+from projects.cognis_vault.sdk.cognis_sdk import CognisSDK
+from projects.common.bench import free_port
+
+def measure(walk):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = walk()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 50000], help="vault sizes to test")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        with CognisSDK(f"http://127.0.0.1:{port}", timeout=60) as sdk:
+            sdk.register("bench_user", "SecurePass123!")
+            sdk.login("bench_user", "SecurePass123!")
+            print("=== Cognis Vault Export Memory (client peak heap) ===")
+            stored = 0
+            for size in sorted(args.sizes):
+                sdk.add_secrets((f"secret_{i}", "Bench", f"value_{i}" * 8) for i in range(stored, size))
+                stored = size
+                for name, walk in (
+                    ("list_secrets", lambda: sum(1 for r in sdk.list_secrets(lazy=False))),
+                    ("iter_secrets", lambda: sum(1 for r in sdk.iter_secrets())),
+                ):
+                    count, elapsed, peak_mb = measure(walk)
+                    print(f"{size:>8} records  {name:>13}: {count} rows in {elapsed:.2f}s, peak {peak_mb:.1f} MiB")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Overhead benchmark for the /metrics instrumentation.
+
+Serves the same trivial FastAPI app with and without MetricsMiddleware
+in-process over httpx's ASGI transport. It alternates rounds to even out
+noise and reports the added cost per request. A trivial endpoint is the
+worst case: real endpoints spend milliseconds in SQLite or Argon2, so the
+relative overhead there is far smaller.
+
+    python projects/cognis_vault/tests/bench_metrics.py --requests 5000 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+import httpx
+from fastapi import FastAPI
+from projects.common.metrics import MetricsMiddleware, MetricsRegistry
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware, registry=MetricsRegistry())
+    return app
+
+async def time_requests(app: FastAPI, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/items/0")  # warm-up: builds the middleware stack
+        started = time.perf_counter()
+        for i in range(count):
+            (await client.get(f"/items/{i}")).raise_for_status()
+        return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = {"plain": build_app(False), "instrumented": build_app(True)}
+    best = {name: float("inf") for name in apps}
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            best[name] = min(best[name], asyncio.run(time_requests(app, args.requests)))
+
+    print("=== MetricsMiddleware Overhead (best of rounds) ===")
+    for name, elapsed in best.items():
+        print(f"{name:>13}: {elapsed / args.requests * 1e6:8.1f} us/request")
+    overhead = (best["instrumented"] - best["plain"]) / args.requests
+    print(f"{'overhead':>13}: {overhead * 1e6:8.1f} us/request ({overhead / (best['plain'] / args.requests):+.1%})")
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "observe() micro-benchmark", ("route",))
+    started = time.perf_counter()
+    for i in range(100000):
+        histogram.observe(i * 1e-6, "/items/{item_id}")
+    print(f"{'observe()':>13}: {(time.perf_counter() - started) / 100000 * 1e9:8.0f} ns/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Audit retention benchmark for the Cognis Vault archive.
+
+Seeds --events audit rows for --users users, spread over --months months
+ending today, in a temp database. Then moves everything older than the
+hot window into monthly archive partitions with enforce_retention.
+
+Before the timed run, one run is interrupted after its first chunk has
+been archived but before that chunk was deleted from the hot table (a
+crash between the two steps). The next run re-reads those rows. The check
+queries every user's full history from the archive and the hot table, and
+fails on any missing or duplicated event id.
+
+Reports rows moved per second, rows skipped as already archived, archive
+size and a sample user query time.
+
+    python projects/cognis_vault/tests/bench_retention.py --events 200000 --users 50 --months 12
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from projects.cognis_vault.api import audit_archive as retention
+from projects.cognis_vault.api.audit_archive import AuditArchive, enforce_retention
+from projects.cognis_vault.api.db import build_engine, init_db
+from projects.cognis_vault.api.models import AuditLog, User
+from projects.common.bench import temp_database_url, temp_dir
+
+HOT_DAYS = 30
+
+class SimulatedCrash(Exception):
+    pass
+
+class CrashingArchive(AuditArchive):
+    """Archive whose first append succeeds and then raises, before retention deletes the chunk"""
+
+    crashed = False
+
+    def append(self, month, rows):
+        count = super().append(month, rows)
+        if not self.crashed:
+            self.crashed = True
+            raise SimulatedCrash()
+        return count
+
+async def seed(engine, events: int, users: int, months: int):
+    now = datetime.utcnow()
+    rng = random.Random(7)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"id": i + 1, "username": f"user_{i}", "hashed_password": "x"} for i in range(users)
+        ])
+        span = months * 30 * 86400
+        for start in range(0, events, 20_000):
+            await conn.execute(insert(AuditLog), [
+                {"user_id": rng.randint(1, users), "action": "READ_RECORD", "ip_address": "127.0.0.1",
+                 "timestamp": now - timedelta(seconds=rng.uniform(0, span))}
+                for _ in range(start, min(events, start + 20_000))
+            ])
+
+async def history(engine, archive: AuditArchive, user_id: int):
+    async with AsyncSession(engine) as session:
+        hot = (await session.exec(select(AuditLog.id).where(AuditLog.user_id == user_id))).all()
+    archived = [log.id for log in archive.query(user_id, None, None, None, 10 ** 9)]
+    return archived + list(hot)
+
+async def run(args):
+    workdir = temp_dir()
+    engine = build_engine(temp_database_url(directory=workdir))
+    await init_db(engine)
+    await seed(engine, args.events, args.users, args.months)
+    # Small chunks so the interrupted run leaves most of the work to the next one
+    retention.RETENTION_CHUNK = args.chunk
+
+    archive = CrashingArchive(os.path.join(workdir, "audit_archive"))
+    try:
+        await enforce_retention(engine, archive, HOT_DAYS)
+    except SimulatedCrash:
+        pass
+    started = time.perf_counter()
+    moved = await enforce_retention(engine, archive, HOT_DAYS)
+    elapsed = time.perf_counter() - started
+    skipped = archive.last_run["already_archived"]
+
+    ids = Counter()
+    for user_id in range(1, args.users + 1):
+        ids.update(await history(engine, archive, user_id))
+    duplicated = sum(count - 1 for count in ids.values())
+    missing = args.events - len(ids)
+    async with AsyncSession(engine) as session:
+        total = len((await session.exec(select(AuditLog.id))).all())
+    size = sum(os.path.getsize(os.path.join(archive.directory, name)) for name in os.listdir(archive.directory))
+
+    query_started = time.perf_counter()
+    since = datetime.utcnow() - timedelta(days=HOT_DAYS + 60)
+    archive.query(1, since, since + timedelta(days=30), None, 100)
+    query_ms = (time.perf_counter() - query_started) * 1000
+
+    print(f"=== Audit retention ({args.events} events, {args.users} users, {args.months} months, "
+          f"chunk {args.chunk}) ===")
+    print(f"moved {moved} rows in {elapsed:.2f}s = {moved / elapsed:.0f} rows/s; "
+          f"{skipped} already archived by the interrupted run")
+    print(f"hot rows left {total}; archive {len(archive.months())} partitions, {size / 1e6:.1f} MB")
+    print(f"one user, one archived month: {query_ms:.1f} ms")
+    print(f"after crash + rerun: missing {missing}, duplicated {duplicated}")
+    await engine.dispose()
+    if missing or duplicated:
+        raise SystemExit("retention lost or duplicated audit events")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--chunk", type=int, default=retention.RETENTION_CHUNK)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
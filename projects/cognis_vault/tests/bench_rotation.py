@@ -0,0 +1,98 @@
+"""
+Throughput and resume benchmark for the SDK key-rotation engine.
+
+Starts the vault API with uvicorn (temp database) and seeds a vault. It then
+changes the master password through CognisSDK.change_password, which
+re-encrypts every record under the new key. The first attempt is
+interrupted after --interrupt-after pages. The second picks up from the
+checkpoint file. The script reports records/s for each run and checks that
+every record decrypts under the new password afterwards.
+
+One record is stored under a foreign key, so it cannot be rotated. The
+resumed run must then refuse to change the password and keep its
+checkpoint. Once that record is deleted, a third run retries only the
+failed id and completes.
+
+    python projects/cognis_vault/tests/bench_rotation.py --records 20000 --workers 4
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from bench_sdk_http import start_server
+from projects.cognis_vault.sdk.cognis_sdk import CognisSDK
+from projects.cognis_vault.sdk.records import DECRYPTION_FAILED, derive_key
+from projects.cognis_vault.sdk.rotation import RotationIncomplete
+from projects.common.bench import free_port, temp_dir
+
+OLD_PASSWORD = "SecurePass123!"
+NEW_PASSWORD = "EvenMoreSecure456!"
+
+class Interrupted(Exception):
+    pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4, help="re-encryption threads")
+    parser.add_argument("--interrupt-after", type=int, default=10, help="pages before the simulated crash (0: none)")
+    args = parser.parse_args()
+
+    checkpoint = os.path.join(temp_dir(), "rotation.json")
+    port = free_port()
+    server = start_server(port)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        with CognisSDK(url, timeout=60) as sdk:
+            sdk.register("bench_user", OLD_PASSWORD)
+            sdk.login("bench_user", OLD_PASSWORD)
+            sdk.add_secrets((f"record_{i}", "Password", f"secret-{i}") for i in range(args.records))
+            sdk.encryption_key = derive_key("some other password")
+            foreign_id = sdk.add_secret("foreign", "Password", "unrotatable")["id"]
+
+        print(f"=== Key Rotation ({args.records} records, {args.workers} workers) ===")
+        if args.interrupt_after:
+            def crash(state):
+                if state["rotated"] >= args.interrupt_after * 500:
+                    raise Interrupted
+            with CognisSDK(url, timeout=60) as sdk:
+                sdk.login("bench_user", OLD_PASSWORD)
+                try:
+                    sdk.change_password(OLD_PASSWORD, NEW_PASSWORD, checkpoint, args.workers, progress=crash)
+                    print("interrupt point not reached")
+                except Interrupted:
+                    print(f"interrupted; checkpoint kept: {os.path.exists(checkpoint)}")
+
+        # The server password is unchanged until the rotation completes, so resume logs in with the old one
+        with CognisSDK(url, timeout=60) as sdk:
+            sdk.login("bench_user", OLD_PASSWORD)
+            try:
+                sdk.change_password(OLD_PASSWORD, NEW_PASSWORD, checkpoint, args.workers)
+                raise RuntimeError("password changed although a record could not be rotated")
+            except RotationIncomplete as exc:
+                report = exc.report
+                print(f"resumed run: {report['rotated']} records in {report['elapsed']:.2f}s "
+                      f"= {report['records_per_second']:.0f} records/s; refused: failed ids {report['failed']}")
+            with CognisSDK(url, timeout=60) as probe:
+                print(f"checkpoint kept: {os.path.exists(checkpoint)}; "
+                      f"old password still valid: {probe.login('bench_user', OLD_PASSWORD)}")
+            sdk.delete_secret(foreign_id)
+            report = sdk.change_password(OLD_PASSWORD, NEW_PASSWORD, checkpoint, args.workers)
+            print(f"retry run: {report['rotated']} records "
+                  f"(total {report['total_rotated']}, skipped {report['skipped']}, failed {len(report['failed'])})")
+        print(f"checkpoint removed: {not os.path.exists(checkpoint)}")
+
+        with CognisSDK(url, timeout=60) as sdk:
+            if not sdk.login("bench_user", NEW_PASSWORD):
+                raise RuntimeError("login with the new password failed")
+            secrets = sdk.list_secrets(lazy=False)
+            broken = sum(1 for s in secrets if s["payload"] == DECRYPTION_FAILED)
+            print(f"verified: {len(secrets) - broken}/{len(secrets)} records decrypt with the new password")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-call latency micro-benchmark for CognisSDK's HTTP layer.
+
+Starts the vault API with uvicorn on a free local port (temp database),
+then times small authenticated GET /records?limit=1 calls made with
+module-level requests.get (a new TCP connection per call, the old SDK
+behavior) and with the SDK's pooled keep-alive session.
+
+    python projects/cognis_vault/tests/bench_sdk_http.py --calls 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+import requests
+from projects.cognis_vault.sdk.cognis_sdk import CognisSDK
+from projects.common.bench import ROOT, free_port, percentile, temp_database_url, temp_dir
+
+def isolated_environment(workdir: Optional[str] = None) -> dict:
+    """Vault API settings for a fresh temp database and audit archive"""
+    workdir = workdir or temp_dir("cognis_bench_")
+    return {"COGNIS_DATABASE_URL": temp_database_url(directory=workdir),
+            "COGNIS_AUDIT_ARCHIVE_DIR": os.path.join(workdir, "audit_archive")}
+
+def start_server(port: int) -> subprocess.Popen:
+    workdir = temp_dir("cognis_bench_")
+    env = dict(os.environ, PYTHONPATH=ROOT, **isolated_environment(workdir))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "projects.cognis_vault.api.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API server did not become ready")
+
+def time_calls(call, count: int):
+    call()  # warm-up (and, for the pooled session, open the connection)
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call().raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="calls per mode")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        with CognisSDK(f"http://127.0.0.1:{port}") as sdk:
+            sdk.register("bench_user", "SecurePass123!")
+            if not sdk.login("bench_user", "SecurePass123!"):
+                raise RuntimeError("login failed")
+            url = f"{sdk.base_url}/records"
+            kwargs = {"params": {"limit": 1}, "headers": {"Authorization": f"Bearer {sdk.token}"}, "timeout": 5}
+
+            print("=== CognisSDK HTTP Per-Call Latency ===")
+            for name, call in (("per-call connection", lambda: requests.get(url, **kwargs)),
+                               ("pooled session", lambda: sdk.session.get(url, **kwargs))):
+                samples = time_calls(call, args.calls)
+                print(f"{name:>20}: mean={sum(samples) / len(samples) * 1000:.2f}ms "
+                      f"p50={percentile(samples, 50) * 1000:.2f}ms p99={percentile(samples, 99) * 1000:.2f}ms")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
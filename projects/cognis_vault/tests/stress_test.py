@@ -1,48 +1,268 @@
-import sys
+"""
+Cognis Vault load test and benchmark harness.
+
+Drives the vault API either in-process through httpx's ASGI transport (no
+sockets; client and app share one event loop) or over HTTP against a
+server it launches (or --url). Each scenario is swept across concurrency
+levels and reported as throughput plus p50/p95/p99 latency. The results
+go to a JSON artifact. With --baseline, the run fails (exit code 1) when
+a metric regresses by more than --threshold.
+
+Scenarios:
+    register     register-storm: every request creates a new account
+    login        login-storm: repeated POST /token for one account
+    bulk_insert  POST /records/batch with --batch-size records
+    list         page through a vault of --records records
+    audit        page through the audit trail of --records events
+
+    python projects/cognis_vault/tests/stress_test.py --transport asgi --concurrency 1 8 32
+    python projects/cognis_vault/tests/stress_test.py --transport http --output run.json \\
+        --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import itertools
+import json
 import os
+import platform
+import sys
 import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+import httpx
+from bench_sdk_http import isolated_environment, start_server
+from cryptography.fernet import Fernet
+from projects.common.bench import free_port, percentile
+
+PASSWORD = "SecurePass123!"
+MAX_PAGE = 1000
+DEFAULT_REQUESTS = {"register": 50, "login": 100, "bulk_insert": 50, "list": 20, "audit": 50}
+# Compared in baseline mode: (metric, higher_is_better)
+COMPARED_METRICS = (("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+_usernames = itertools.count()
+_payload = Fernet(Fernet.generate_key()).encrypt(b"benchmark secret value").decode()
+
+def unique_username(prefix: str) -> str:
+    return f"{prefix}_{os.getpid()}_{next(_usernames)}"
+
+async def account(client: httpx.AsyncClient, prefix: str) -> dict:
+    username = unique_username(prefix)
+    (await client.post("/register", json={"username": username, "hashed_password": PASSWORD})).raise_for_status()
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def record_rows(count: int, offset: int = 0):
+    return [{"title": f"bench_{offset + i}", "service_type": "Bench", "encrypted_payload": _payload}
+            for i in range(count)]
+
+async def seed_records(client: httpx.AsyncClient, headers: dict, count: int):
+    for offset in range(0, count, MAX_PAGE):
+        rows = record_rows(min(MAX_PAGE, count - offset), offset)
+        (await client.post("/records/batch", json=rows, headers=headers)).raise_for_status()
+
+async def read_all(client: httpx.AsyncClient, path: str, headers: dict) -> int:
+    # Keyset pagination, the same walk the SDK does
+    total, after_id = 0, None
+    while True:
+        params = {"limit": MAX_PAGE}
+        if after_id is not None:
+            params["after_id"] = after_id
+        response = await client.get(path, params=params, headers=headers)
+        response.raise_for_status()
+        page = response.json()
+        total += len(page)
+        if len(page) < MAX_PAGE:
+            return total
+        after_id = page[-1]["id"]
+
+# Each scenario prepares its own accounts/data (untimed) and returns the timed
+# operation: an async callable that returns True when the request succeeded.
+
+async def setup_register(client, args):
+    async def op():
+        username = unique_username("storm")
+        response = await client.post("/register", json={"username": username, "hashed_password": PASSWORD})
+        return response.status_code == 200
+    return op
+
+async def setup_login(client, args):
+    username = unique_username("login")
+    (await client.post("/register", json={"username": username, "hashed_password": PASSWORD})).raise_for_status()
+
+    async def op():
+        response = await client.post("/token", data={"username": username, "password": PASSWORD})
+        return response.status_code == 200
+    return op
 
-# Add parent dir to path to import SDK
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from sdk.cognis_sdk import CognisSDK
-
-def run_test():
-    print("=== Cognis Vault Pro Reliability Test ===")
-    sdk = CognisSDK("http://127.0.0.1:8888")
-    
-    # 1. Register & Login
-    ts = int(time.time())
-    user = f"pro_tester_{ts}"
-    print(f"Testing Registration for {user}...")
-    sdk.register(user, "SecurePass123!")
-    
-    if not sdk.login(user, "SecurePass123!"):
-        print("[FAIL] Login failed")
-        return
-
-    print("[PASS] Login successful with Argon2 auth")
-
-    # 2. Bulk Insertion (Stress Test)
-    print("Performing Bulk Secure Insert (10 records)...")
-    for i in range(10):
-        sdk.add_secret(f"Secret_{i}", "TestType", f"Data_Value_{i}")
-    
-    # 3. Validation
-    records = sdk.list_secrets()
-    if len(records) >= 10:
-        print(f"[PASS] Successfully retrieved {len(records)} records")
-        # Check one record decryption
-        if "Data_Value_0" in str(records):
-            print("[PASS] End-to-End Encryption verified (Client-side decrypt successful)")
+async def setup_bulk_insert(client, args):
+    headers = await account(client, "bulk")
+    rows = record_rows(args.batch_size)
+
+    async def op():
+        response = await client.post("/records/batch", json=rows, headers=headers)
+        return response.status_code == 200 and len(response.json()["ids"]) == args.batch_size
+    return op
+
+async def setup_list(client, args):
+    headers = await account(client, "list")
+    await seed_records(client, headers, args.records)
+
+    async def op():
+        return await read_all(client, "/records", headers) == args.records
+    return op
+
+async def setup_audit(client, args):
+    # Every inserted record leaves a CREATE_RECORD audit event (plus one for registration)
+    headers = await account(client, "audit")
+    await seed_records(client, headers, args.records)
+
+    async def op():
+        return await read_all(client, "/audit", headers) == args.records + 1
+    return op
+
+SCENARIOS = {
+    "register": setup_register,
+    "login": setup_login,
+    "bulk_insert": setup_bulk_insert,
+    "list": setup_list,
+    "audit": setup_audit,
+}
+
+async def run_level(op, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            started = time.perf_counter()
+            try:
+                ok = await op()
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+    result = {"concurrency": concurrency, "requests": requests, "errors": errors,
+              "duration_s": round(duration, 4), "throughput_rps": round(len(latencies) / duration, 2)}
+    if latencies:
+        result.update({
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 3) for pct in (50, 95, 99)},
+            "max_ms": round(max(latencies) * 1000, 3),
+        })
+    return result
+
+async def run_scenarios(client: httpx.AsyncClient, args) -> list:
+    results = []
+    for name in args.scenarios:
+        op = await SCENARIOS[name](client, args)
+        requests = args.requests or DEFAULT_REQUESTS[name]
+        for concurrency in args.concurrency:
+            result = dict(scenario=name, **await run_level(op, requests, concurrency))
+            results.append(result)
+            print(f"{name:>12} x{concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                  f"p50={result.get('p50_ms', 0):.1f}ms p95={result.get('p95_ms', 0):.1f}ms "
+                  f"p99={result.get('p99_ms', 0):.1f}ms errors={result['errors']}")
+    return results
+
+async def run_asgi(args) -> list:
+    # The API reads its configuration at import time, so the temp database is set up first
+    os.environ.update(isolated_environment())
+    from projects.cognis_vault.api.main import app
+
+    # ASGITransport does not emit lifespan events; run startup/shutdown around the benchmark
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cognis.bench", timeout=args.timeout) as client:
+            return await run_scenarios(client, args)
+
+async def run_http(args, base_url: str) -> list:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        return await run_scenarios(client, args)
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Return regressions beyond threshold for (scenario, concurrency) pairs present in both runs"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for current in results:
+        base = previous.get((current["scenario"], current["concurrency"]))
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{current['scenario']} x{current['concurrency']} {metric}: "
+                                   f"{old} -> {new} ({change:+.1%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--url", help="benchmark an already running server (http transport only)")
+    parser.add_argument("--scenarios", nargs="+", choices=tuple(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, help="requests per concurrency level (default: per scenario)")
+    parser.add_argument("--records", type=int, default=1000, help="vault size for list/audit scenarios")
+    parser.add_argument("--batch-size", type=int, default=500, help="records per bulk_insert request")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", default="stress_results.json", help="JSON results artifact")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression ratio (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print(f"=== Cognis Vault Benchmark ({args.transport}) ===")
+    if args.transport == "asgi":
+        results = asyncio.run(run_asgi(args))
+    elif args.url:
+        results = asyncio.run(run_http(args, args.url.rstrip("/")))
     else:
-        print("[FAIL] Record count mismatch")
+        port = free_port()
+        server = start_server(port)
+        try:
+            results = asyncio.run(run_http(args, f"http://127.0.0.1:{port}"))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "transport": args.transport,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "records": args.records,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Results written to {args.output}")
 
-    # 4. Audit Log Verification
-    logs = sdk.get_audit_logs()
-    print(f"[INFO] Audit Logs captured {len(logs)} actions")
-    if len(logs) > 0:
-        print("[PASS] Security audit working")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"[FAIL] {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"[PASS] No regression beyond {args.threshold:.0%} against {args.baseline}")
 
 if __name__ == "__main__":
-    run_test()
+    main()
@@ -0,0 +1,34 @@
+"""
+Shared helpers for the benchmark scripts under projects/*/tests.
+
+The scripts run standalone (``python projects/<app>/tests/bench_x.py``), so
+each one puts the workspace root on sys.path before importing this module.
+"""
+import os
+import socket
+import tempfile
+from typing import Optional, Sequence
+
+# Workspace root: the directory that contains projects/
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of samples; 0.0 when there are none"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def temp_dir(prefix: str = "bench_") -> str:
+    """A fresh temporary directory (left in place for inspection after the run)"""
+    return tempfile.mkdtemp(prefix=prefix)
+
+def temp_database_url(name: str = "bench.db", directory: Optional[str] = None) -> str:
+    """aiosqlite URL of a new SQLite file in directory, or in a fresh temporary directory"""
+    return f"sqlite+aiosqlite:///{os.path.join(directory or temp_dir(), name)}"
+
+def free_port() -> int:
+    """A local TCP port that was free a moment ago"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
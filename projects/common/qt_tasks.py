@@ -0,0 +1,181 @@
+"""
+Background tasks for the PySide6 GUIs.
+
+Blocking work (SDK calls, HTTP round trips, PBKDF2) runs on a QThreadPool.
+Results come back through queued signals, so callbacks always run on the
+GUI thread.
+
+Tasks submitted under the same key are coalesced: while one is running,
+further submissions collapse into a single follow-up that carries the
+latest arguments, and the stale result is dropped. Cancelling keeps a
+queued task from starting and discards a running task's result. A task
+that reports progress through ``task.report()`` also stops at its next
+report. A cancelled task calls ``on_cancel`` (if given) instead of
+``on_done``/``on_error``, with the result it produced anyway or None, so
+callers that track in-flight work can reset it.
+"""
+import itertools
+import threading
+from typing import Any, Callable, Dict, Optional
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QProgressBar, QPushButton, QWidget
+
+class TaskCancelled(Exception):
+    """Raised by Task.report() once the task has been cancelled"""
+
+class _TaskSignals(QObject):
+    done = Signal(object, object, object)  # task, result, error
+    progress = Signal(object, int, int)    # task, done, total (0 = unknown)
+
+class Task(QRunnable):
+    def __init__(self, key: Any, fn: Callable, args: tuple, kwargs: dict, with_task: bool):
+        super().__init__()
+        # The runner keeps the Python object alive until the done signal has been handled
+        self.setAutoDelete(False)
+        self.key = key
+        self.signals = _TaskSignals()
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self.on_error: Optional[Callable[[BaseException], None]] = None
+        self.on_progress: Optional[Callable[[int, int], None]] = None
+        self.on_cancel: Optional[Callable[[Any], None]] = None
+        self._fn, self._args, self._kwargs, self._with_task = fn, args, kwargs, with_task
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, done: int, total: int = 0):
+        # Called from the worker thread; doubles as the cancellation point for long loops
+        if self.cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(self, done, total)
+
+    def run(self):
+        result = error = None
+        if self.cancelled:
+            error = TaskCancelled()
+        else:
+            try:
+                args = (self,) + self._args if self._with_task else self._args
+                result = self._fn(*args, **self._kwargs)
+            except Exception as e:
+                error = e
+        self.signals.done.emit(self, result, error)
+
+class TaskRunner(QObject):
+    busy_changed = Signal(bool)
+    progress = Signal(int, int)
+
+    def __init__(self, parent: Optional[QObject] = None, max_threads: int = 4):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._running: Dict[Any, Task] = {}
+        self._queued: Dict[Any, Task] = {}
+        self._unkeyed = itertools.count()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._running)
+
+    def submit(self, fn: Callable, *args, key: Any = None, on_done=None, on_error=None, on_progress=None,
+               on_cancel=None, with_task: bool = False, **kwargs) -> Task:
+        """Run fn(*args, **kwargs) off the GUI thread; with_task=True passes the Task first (for report())"""
+        task = Task(key if key is not None else ("unkeyed", next(self._unkeyed)), fn, args, kwargs, with_task)
+        task.on_done, task.on_error, task.on_progress = on_done, on_error, on_progress
+        task.on_cancel = on_cancel
+        task.signals.done.connect(self._on_done)
+        task.signals.progress.connect(self._on_progress)
+        if task.key in self._running:
+            # At most one follow-up per key; a newer request replaces an older queued one
+            self._queued[task.key] = task
+        else:
+            self._start(task)
+        return task
+
+    def _start(self, task: Task):
+        was_busy = self.busy
+        self._running[task.key] = task
+        self._pool.start(task)
+        if not was_busy:
+            self.busy_changed.emit(True)
+
+    def cancel(self, key: Any = None):
+        """Cancel one key, or everything when key is None"""
+        keys = list(self._running) + list(self._queued) if key is None else [key]
+        for k in keys:
+            self._queued.pop(k, None)
+            if k in self._running:
+                self._running[k].cancel()
+
+    def shutdown(self, timeout_ms: int = 3000):
+        self.cancel()
+        self._pool.waitForDone(timeout_ms)
+
+    @Slot(object, object, object)
+    def _on_done(self, task: Task, result, error):
+        if self._running.get(task.key) is task:
+            del self._running[task.key]
+        follow_up = self._queued.pop(task.key, None)
+        if follow_up is not None:
+            # The queued request supersedes this result
+            self._start(follow_up)
+        elif task.cancelled or isinstance(error, TaskCancelled):
+            # A task cancelled mid-run may still have finished its work; the caller decides whether to keep it
+            if task.on_cancel is not None:
+                task.on_cancel(result)
+        elif error is not None:
+            if task.on_error is not None:
+                task.on_error(error)
+        elif task.on_done is not None:
+            task.on_done(result)
+        if not self.busy:
+            self.busy_changed.emit(False)
+
+    @Slot(object, int, int)
+    def _on_progress(self, task: Task, done: int, total: int):
+        if task.cancelled:
+            return
+        if task.on_progress is not None:
+            task.on_progress(done, total)
+        self.progress.emit(done, total)
+
+class TaskProgress(QWidget):
+    """Status-bar widget: busy/progress bar plus a cancel button, visible only while tasks run"""
+
+    def __init__(self, runner: TaskRunner, cancel_text: str = "Cancel", parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel()
+        self.bar = QProgressBar()
+        self.bar.setFixedWidth(160)
+        self.bar.setRange(0, 0)
+        self.cancel_btn = QPushButton(cancel_text)
+        self.cancel_btn.clicked.connect(lambda: runner.cancel())
+        layout.addWidget(self.label)
+        layout.addWidget(self.bar)
+        layout.addWidget(self.cancel_btn)
+        runner.busy_changed.connect(self._on_busy)
+        runner.progress.connect(self._on_progress)
+        self.setVisible(False)
+
+    def _on_busy(self, busy: bool):
+        if busy:
+            self.bar.setRange(0, 0)
+            self.label.clear()
+        self.setVisible(busy)
+
+    def _on_progress(self, done: int, total: int):
+        # Unknown totals keep the bar indeterminate and show the running count instead
+        if total > 0:
+            self.bar.setRange(0, total)
+            self.bar.setValue(done)
+            self.label.clear()
+        else:
+            self.bar.setRange(0, 0)
+            self.label.setText(str(done))